@@ -0,0 +1,400 @@
+import argparse
+import asyncio
+import inspect
+import json
+import sys
+import time
+import numpy as np
+import testing
+import player_testing
+from controller_testing import FarkleController
+
+
+async def _resolve(result):
+    """
+    awaits the result of a player's method if it is awaitable, so synchronous players can play along asynchronous ones
+    """
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+# integer types a lock or bank may be given in. bool is a subclass of int, floats and strings are rejected rather than converted
+_INTEGERS = (int, np.integer, np.bool_)
+
+def parse_action(move, dice):
+    """
+    returns the (lock, bank) of a move, checked before it reaches the environment
+
+    Raises
+    ------
+    ValueError
+        unless move is a dict whose "lock" is a list, tuple or array of exactly 0 or 1 for each
+        of the dice, and whose "bank" is a bool, 0 or 1. a lock of 2 would otherwise pass
+        FarkleEnv.check_legal, and corrupt the locked dice
+    """
+    if not isinstance(move, dict) or "lock" not in move or "bank" not in move:
+        raise ValueError(f"a move is a dict with a lock and a bank, got {move!r}")
+    lock, bank = move["lock"], move["bank"]
+    if not isinstance(lock, (list, tuple, np.ndarray)) or len(lock) != dice or any(not isinstance(x, _INTEGERS) or x not in (0, 1) for x in lock):
+        raise ValueError(f"a lock is 0 or 1 for each of the {dice} dice, got {lock!r}")
+    if isinstance(bank, np.ndarray) and bank.size == 1:
+        bank = bank.reshape(()).item()
+    if not isinstance(bank, _INTEGERS) or bank not in (0, 1):
+        raise ValueError(f"bank is a bool, got {bank!r}")
+    return [int(x) for x in lock], bool(bank)
+
+def _to_json(observation):
+    """
+    returns a JSON-serializable copy of an observation, detached from the environment's live arrays
+    """
+    return {key: value.tolist() if isinstance(value, np.ndarray) else int(value) for key, value in observation.items()}
+
+
+class AsyncPlayer(player_testing.Player):
+    """
+    A player whose play and update are coroutines, for players that wait on something outside
+    the process, e.g. a remote client or a human. AsyncFarkleController awaits them, so other
+    games on the event loop carry on meanwhile.
+    """
+
+    async def play(self, observation):
+        raise NotImplementedError
+
+    async def update(self, observation, reward):
+        pass
+
+
+class StreamPlayer(AsyncPlayer):
+    """
+    A remote player on the other end of an asyncio stream, e.g. a TCP connection, speaking JSON lines.
+
+    Before each move it is sent {"type": "play", "move": n, "observation": ..., "action_mask": ...},
+    with action_mask as in FarkleEnv.action_mask, and answers {"move": n, "lock": [0 or 1 per die], "bank": bool}.
+    After each step it is sent {"type": "update", "observation": ..., "reward": ...}.
+
+    n counts the moves asked of the player. A reply to an earlier move, which arrived after the
+    controller gave up waiting on it, is dropped rather than taken as the answer to the current one.
+    """
+
+    def __init__(self, reader, writer, verbose = False):
+        """
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            stream the player's moves are read from
+        writer : asyncio.StreamWriter
+            stream the player's messages are written to
+        verbose : bool
+            whether log() writes anything
+        """
+        super().__init__(verbose)
+        self.reader = reader
+        self.writer = writer
+        # number of the last move asked of the player
+        self.move = 0
+
+    async def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        await self.writer.drain()
+
+    async def play(self, observation):
+        self.move += 1
+        await self.send({"type": "play", "move": self.move, "observation": _to_json(observation), "action_mask": self.controller.action_mask().astype(int).tolist()})
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("the player disconnected")
+            move = json.loads(line)
+            if not isinstance(move, dict) or "move" not in move:
+                raise ValueError(f"a reply carries the number of its move, got {move!r}")
+            if move["move"] == self.move:
+                break
+            self.log("Dropping a late reply to move %s.", move["move"])
+        lock, bank = parse_action(move, len(observation["dice_values"]))
+        self.log("Remote player decided to lock %s, bank: %s", lock, bank)
+        return lock, bank
+
+    async def update(self, observation, reward):
+        await self.send({"type": "update", "observation": _to_json(observation), "reward": int(reward)})
+
+
+class ConsolePlayer(AsyncPlayer):
+    """
+    A human player on stdin, in the format of ManualPlayer: the dice to lock as a string of
+    '0' and '1', optionally followed by 'y' to bank, e.g. "100010 y". Reading stdin through
+    the event loop keeps the other games going while the human thinks.
+    """
+
+    def __init__(self, reader, verbose = True):
+        """
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            stream of stdin, see open_stdin
+        verbose : bool
+            whether log() writes anything
+        """
+        super().__init__(verbose)
+        self.reader = reader
+
+    async def play(self, observation):
+        self.controller.print_dice(observation, None)
+        print(f"locked: {''.join(str(int(x)) for x in observation['dice_locked'])}, points this turn: {observation['points_this_turn']}, points: {observation['player_points']}")
+        while True:
+            print("dice to lock, and y to bank?", flush=True)
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("stdin was closed")
+            fields = line.decode().split()
+            lock = fields[0] if fields else ""
+            bank = len(fields) > 1 and fields[1].lower() in ("y", "yes")
+            if len(lock) != len(observation["dice_values"]) or any(x not in "01" for x in lock):
+                self.log("Error: string of dice to lock must consist of '1' in the places of dice to lock, and '0' in all other places")
+                continue
+            lock = [int(x) for x in lock]
+            if not self.controller.check_legal({"lock": lock, "bank": bank}):
+                self.log("Error: illegal action")
+                continue
+            return lock, bank
+
+async def open_stdin():
+    """
+    returns an asyncio.StreamReader reading stdin, for ConsolePlayer
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+class AsyncFarkleController(FarkleController):
+    """
+    A FarkleController whose games are coroutines, so thousands of them can be multiplexed on one
+    event loop while their players think, see run_games.
+
+    Players may be AsyncPlayers, whose play and update are awaited, or ordinary Players, which
+    are called directly. A player that takes longer than move_timeout seconds to move, answers
+    with an illegal action, or disconnects has the fallback player move for it instead.
+
+    The play of an ordinary Player is a synchronous call made on the event loop itself, so it is
+    not covered by move_timeout: it blocks every game on the loop until it returns.
+    """
+
+    def __init__(self, env, players, render_mode = None, recorder = None, move_timeout = None, fallback = None, profile = False):
+        """
+        Parameters
+        ----------
+        env: FarkleEnv
+            the gymnasium environment that will be played
+        players: array-like
+            a list of player objects
+        render_mode: str, optional
+            "human" to log the game and print every action to stdout, None to stay silent
+        recorder: GameRecorder, optional
+            records every game played, see game_record.py
+        move_timeout: float, optional
+            seconds an AsyncPlayer has to choose each move, no limit if None
+        fallback: Player, optional
+            player moving in place of one that timed out, defaults to a RandomPlayer
+        profile: bool
+            whether to time the decisions of each player, including time spent waiting on them, see stats
+        """
+        super().__init__(env, players, render_mode=render_mode, recorder=recorder, profile=profile)
+        self.move_timeout = move_timeout
+        self.fallback = fallback if fallback is not None else player_testing.RandomPlayer()
+        self.fallback.set_controller(self)
+        # number of moves the fallback player made, per player
+        self.fallback_moves = [0] * len(players)
+
+    async def _get_action(self, player, observation):
+        """
+        awaits the move of a player, within move_timeout, falling back on self.fallback if needed
+        """
+        turn = observation["turn"]
+        start = time.perf_counter_ns()
+        try:
+            lock, bank = await asyncio.wait_for(_resolve(player.play(observation)), self.move_timeout)
+            if self._decision_stats is not None:
+                self._record_decision(turn, time.perf_counter_ns() - start)
+            # locks that are not exactly 0 or 1 would pass check_legal and corrupt the locked dice
+            lock, bank = parse_action({"lock": lock, "bank": bank}, self._env.dice)
+            action = {"lock": lock, "bank": bank}
+            if self.check_legal(action):
+                return action
+            self.log("Player %s played an illegal action.", turn)
+        except asyncio.TimeoutError:
+            self.log("Player %s ran out of time.", turn)
+        except (ConnectionError, ValueError, KeyError, TypeError) as error:
+            self.log("Player %s failed to move: %s", turn, error)
+
+        self.fallback_moves[turn] += 1
+        lock, bank = self.fallback.play(observation)
+        return {"lock": lock, "bank": bank}
+
+    async def _update(self, player, observation, reward):
+        try:
+            await asyncio.wait_for(_resolve(player.update(observation, reward)), self.move_timeout)
+        except (asyncio.TimeoutError, ConnectionError) as error:
+            self.log("Player %s could not be updated: %r", observation["turn"], error)
+
+    async def play_turn(self, player, observation, info, reward, terminated, truncated):
+        """
+        Play a full turn for a given player, see FarkleController.play_turn.
+        """
+        assert not terminated and not truncated
+
+        if info["farkle"]:
+            assert reward == -1
+            self.log("Player %s farkled off the bat! Sending reward to player.", observation["turn"])
+            await self._update(player, observation, reward)
+            return self._farkle_step()
+
+        action = {"bank": False}
+        while not info["farkle"] and not action["bank"] and info["winner"] == -1 and not terminated and not truncated:
+            assert reward == 0
+            self.log("Prompting player %s to play!", observation["turn"])
+            action = await self._get_action(player, observation)
+            if self.render_mode == "human":
+                self.print_action(observation, action)
+            if self.recorder is not None:
+                self.recorder.step(action)
+            observation, reward, terminated, truncated, info = self._env.step(action)
+            if info.get("turn_ended") and not terminated:
+                # the environment is in auto_advance mode, and already started the next turn
+                for update_player, update_observation, update_reward in self._advanced_turn_updates(player, reward, info):
+                    await self._update(update_player, update_observation, update_reward)
+                return observation, reward, terminated, truncated, info
+            self.log("Sending reward of %s to player %s.", reward, observation["turn"])
+            await self._update(player, observation, reward)
+
+        assert not truncated
+
+        if terminated:
+            assert info["winner"] != -1
+            self.log("Player %s won! They got %s points this turn, bringing them to a total of %s points.", observation["turn"], observation["points_this_turn"], observation["player_points"][observation["turn"]])
+            return observation, reward, terminated, truncated, info
+
+        if info["farkle"]:
+            self.log("Player %s farkled! They would have got %s points. They remain at %s points.", observation["turn"], observation["points_this_turn"], observation["player_points"][observation["turn"]])
+            return self._farkle_step()
+        self.log("Player %s banked! They got %s points this turn, bringing them to a total of %s points.", observation["turn"], observation["points_this_turn"], observation["player_points"][observation["turn"]])
+        return self._bank_step()
+
+    async def play_game(self, seed = None):
+        """
+        Play a complete game of Farkle until a winner is determined, see FarkleController.play_game.
+        """
+        observation, info = self._new_game(seed)
+        truncated = False
+        terminated = False
+        reward = -1 if info["farkle"] else 0
+        turns = 0
+        if "skipped_turns" in info:
+            # in auto_advance mode, turns that farkled off the bat are skipped by the environment
+            for update_player, update_observation, update_reward in self._advanced_turn_updates(None, reward, info):
+                await self._update(update_player, update_observation, update_reward)
+            turns += len(info["skipped_turns"])
+
+        while info["winner"] == -1 and not truncated and not terminated:
+            self.log("Start of player %s's turn.", observation["turn"])
+            observation, reward, terminated, truncated, info = await self.play_turn(self.players[observation["turn"]], observation, info, reward, terminated, truncated)
+            turns += 1 + len(info.get("skipped_turns", ()))
+            if info.get("turn_ended"):
+                reward = 0
+
+        self.log("Winner is player %s! It took a total of %s turns to win!", info["winner"], turns)
+        if self.recorder is not None:
+            self.recorder.finish()
+        return info["winner"], turns, observation["player_points"].copy()
+
+def make_controller(players, max_points = 10000, auto_advance = True, **kwargs):
+    """
+    builds the environment and controller of one game, and hands the players the controller
+    """
+    env = testing.FarkleEnv(players=len(players), max_points=max_points, auto_advance=auto_advance)
+    controller = AsyncFarkleController(env, players, **kwargs)
+    for player in players:
+        player.set_controller(controller)
+    return controller
+
+async def run_games(controllers, seeds = None):
+    """
+    Plays one game on each controller concurrently.
+
+    Parameters
+    ----------
+    controllers : list[AsyncFarkleController]
+        one controller per game, with its own environment and players
+    seeds : list[int], optional
+        seed of each game
+
+    Returns
+    -------
+    list[tuple]
+        the result of each game's play_game, in order
+    """
+    seeds = seeds if seeds is not None else [None] * len(controllers)
+    return await asyncio.gather(*(controller.play_game(seed) for controller, seed in zip(controllers, seeds)))
+
+async def serve(host, port, opponent_factories, max_points = 10000, move_timeout = 30.0):
+    """
+    Serves games to remote StreamPlayers over TCP: every connection plays one game as the first
+    seat against new opponents, and the connection is closed when the game is over.
+
+    Parameters
+    ----------
+    host : str
+        address to listen on
+    port : int
+        port to listen on
+    opponent_factories : list[callable]
+        one callable per opponent seat returning a Player
+    max_points : int
+        number of points to win a game
+    move_timeout : float
+        seconds a remote player has to choose each move
+    """
+    async def handle(reader, writer):
+        player = StreamPlayer(reader, writer)
+        controller = make_controller([player] + [factory() for factory in opponent_factories], max_points, move_timeout=move_timeout)
+        try:
+            winner, turns, player_points = await controller.play_game()
+            await player.send({"type": "end", "winner": int(winner), "turns": turns, "player_points": player_points.tolist()})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="play Farkle games concurrently on an asyncio event loop")
+    parser.add_argument("mode", choices=["serve", "console", "bench"], help="serve games over TCP, play one game on stdin, or time concurrent RandomPlayer games")
+    parser.add_argument("--opponents", nargs="*", default=["RandomPlayer"], help="names of Player classes in player_testing, one per opponent seat")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--move-timeout", type=float, default=None, help="seconds a player has to choose each move. no limit by default, except in serve mode, which keeps serve's own default")
+    parser.add_argument("--max-points", type=int, default=10000)
+    args = parser.parse_args()
+
+    factories = [getattr(player_testing, name) for name in args.opponents]
+    if args.mode == "serve":
+        # only override serve's move_timeout when one is given, so remote players that stall still time out
+        timeout = {} if args.move_timeout is None else {"move_timeout": args.move_timeout}
+        asyncio.run(serve(args.host, args.port, factories, args.max_points, **timeout))
+    elif args.mode == "console":
+        async def console():
+            player = ConsolePlayer(await open_stdin())
+            controller = make_controller([player] + [factory() for factory in factories], args.max_points, move_timeout=args.move_timeout, render_mode="human")
+            winner, turns, player_points = await controller.play_game()
+            print(f"player {winner} won after {turns} turns, points: {player_points}")
+        asyncio.run(console())
+    else:
+        began = time.perf_counter()
+        controllers = [make_controller([factory() for factory in factories], args.max_points, move_timeout=args.move_timeout) for _ in range(args.games)]
+        results = asyncio.run(run_games(controllers, list(range(args.games))))
+        print(f"{len(results)} concurrent games in {time.perf_counter() - began:.2f}s")
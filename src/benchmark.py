@@ -0,0 +1,267 @@
+import argparse
+import functools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import numpy as np
+import gymnasium as gym
+import testing
+import player_testing
+import controller_testing
+
+
+def _summarize(samples, unit):
+    """
+    Summarizes the measurements of one benchmark.
+
+    Parameters
+    ----------
+    samples : list[float]
+        one measurement per timed repeat, warm-up repeats already excluded
+    unit : str
+        the unit of the measurements, e.g. "ns/call" or "steps/s"
+
+    Returns
+    -------
+    dict
+        the unit, number of repeats, and mean, median, standard deviation, min and max of the samples
+    """
+    return {
+        "unit": unit,
+        "repeat": len(samples),
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+def _make_cases(seed, count):
+    """
+    Draws fixed (dice values, dice locked, lock action) cases for the rules microbenchmarks.
+    lock actions only contain unlocked dice, so they are the kind of input the rules see during a game.
+    """
+    rng = np.random.default_rng(seed)
+    cases = []
+    for _ in range(count):
+        dice_values = rng.integers(1, 7, size=6)
+        dice_locked = (rng.random(6) < 0.3).astype(int)
+        lock_action = ((rng.random(6) < 0.5) & (dice_locked == 0)).astype(int)
+        cases.append((dice_values, dice_locked, lock_action))
+    return cases
+
+def _make_env(seed, **kwargs):
+    return testing.FarkleEnv(random_seed=seed, **kwargs)
+
+def bench_rules(seed, repeat, warmup, cases):
+    """
+    Microbenchmarks the rules functions, reporting the mean time of one call in nanoseconds.
+
+    Returns
+    -------
+    dict[str, dict]
+        one summary per rules function, see _summarize
+    """
+    env = _make_env(seed)
+    env.reset(seed=seed)
+    cases = _make_cases(seed, cases)
+    observations = [{"dice_values": dice_values, "dice_locked": dice_locked} for dice_values, dice_locked, _ in cases]
+
+    functions = {
+        "calculate_points": lambda: [env.calculate_points(dice_values, lock_action) for dice_values, _, lock_action in cases],
+        "verify_combo": lambda: [env.verify_combo(dice_values, lock_action) for dice_values, _, lock_action in cases],
+        "check_farkle": lambda: [env.check_farkle(dice_values, dice_locked) for dice_values, dice_locked, _ in cases],
+        "get_legal_lock_combinations": lambda: [player_testing.get_legal_lock_combinations(observation) for observation in observations],
+    }
+
+    results = {}
+    for name, function in functions.items():
+        samples = []
+        for i in range(warmup + repeat):
+            start = time.perf_counter_ns()
+            function()
+            elapsed = time.perf_counter_ns() - start
+            if i >= warmup:
+                samples.append(elapsed / len(cases))
+        results[name] = _summarize(samples, "ns/call")
+    return results
+
+def _random_action(env, rng):
+    """
+    picks a uniformly random legal action that locks something or banks, like player_testing.choose_random_action
+    """
+    action_mask = env.action_mask()
+    action_mask[0, 0] = False
+    bank, mask = divmod(int(rng.choice(np.flatnonzero(action_mask))), action_mask.shape[1])
+    return {"bank": bool(bank), "lock": testing.FarkleEnv.mask_to_lock(mask, env.dice)}
+
+def bench_env_step(seed, repeat, warmup, steps):
+    """
+    Measures FarkleEnv.step throughput while playing random legal actions.
+    only the step calls are timed, not choosing the actions or acknowledging banks and farkles
+
+    Returns
+    -------
+    dict
+        summary of the steps per second of each repeat, see _summarize
+    """
+    env = _make_env(seed)
+    rng = np.random.default_rng(seed)
+    observation, info = env.reset(seed=seed)
+
+    samples = []
+    for i in range(warmup + repeat):
+        elapsed = 0
+        for _ in range(steps):
+            while info["farkle"]:
+                observation, reward, terminated, truncated, info = env.acknowledge_farkle()
+            action = _random_action(env, rng)
+
+            start = time.perf_counter_ns()
+            observation, reward, terminated, truncated, info = env.step(action)
+            elapsed += time.perf_counter_ns() - start
+
+            if terminated:
+                observation, info = env.reset()
+            elif action["bank"]:
+                observation, reward, terminated, truncated, info = env.acknowledge_bank()
+        if i >= warmup:
+            samples.append(steps / (elapsed / 1e9))
+    return _summarize(samples, "steps/s")
+
+def bench_play_game(seed, repeat, warmup, games, players):
+    """
+    Measures FarkleController.play_game throughput with RandomPlayers.
+
+    Returns
+    -------
+    dict
+        summary of the games per second of each repeat, see _summarize
+    """
+    env = _make_env(seed, players=players)
+    game_players = [player_testing.RandomPlayer() for _ in range(players)]
+    controller = controller_testing.FarkleController(env, game_players)
+    for player in game_players:
+        player.set_controller(controller)
+    random.seed(seed)
+
+    samples = []
+    for i in range(warmup + repeat):
+        start = time.perf_counter()
+        for game in range(games):
+            controller.play_game(seed + game)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(games / elapsed)
+    return _summarize(samples, "games/s")
+
+def _random_actions(action_mask, rng):
+    """
+    picks a random legal action that locks something or banks in each game of a batch, see _random_action.
+    a game with no such action gets the free reroll, which an autoresetting vector env ignores anyway
+    """
+    action_mask = action_mask.reshape(len(action_mask), -1).copy()
+    action_mask[:, 0] = False
+    indices = np.array([rng.choice(np.flatnonzero(row)) if row.any() else 0 for row in action_mask])
+    return {
+        "bank": (indices >> 6).astype(np.int8).reshape(-1, 1),
+        "lock": ((indices[:, None] >> np.arange(6)) & 1).astype(np.int8),
+    }
+
+def bench_async_vector(seed, repeat, warmup, steps, envs, players):
+    """
+    Measures the throughput of FarkleEnvs stepped in subprocesses by gymnasium's AsyncVectorEnv,
+    with observations written to shared memory, while playing random legal actions.
+    the environments run in auto_advance mode, so a step is all a turn transition needs.
+
+    Returns
+    -------
+    dict
+        summary of the steps per second of each repeat, counting the steps of every environment, see _summarize
+    """
+    env_fns = [functools.partial(_make_env, seed + i, players=players, auto_advance=True, action_masks=True) for i in range(envs)]
+    vector_env = gym.vector.AsyncVectorEnv(env_fns, shared_memory=True)
+    rng = np.random.default_rng(seed)
+    try:
+        observation, info = vector_env.reset(seed=seed)
+        samples = []
+        for i in range(warmup + repeat):
+            elapsed = 0
+            for _ in range(steps):
+                action = _random_actions(info["action_mask"], rng)
+
+                start = time.perf_counter_ns()
+                observation, reward, terminated, truncated, info = vector_env.step(action)
+                elapsed += time.perf_counter_ns() - start
+            if i >= warmup:
+                samples.append(steps * envs / (elapsed / 1e9))
+    finally:
+        vector_env.close()
+    return _summarize(samples, "steps/s")
+
+def run(seed = 0, repeat = 5, warmup = 1, cases = 1000, steps = 2000, games = 10, players = 1, vector_envs = 4):
+    """
+    Runs every benchmark.
+
+    Parameters
+    ----------
+    seed : int
+        seed of the rules cases, dice rolls and players
+    repeat : int
+        number of timed repeats of each benchmark
+    warmup : int
+        number of untimed repeats run before them
+    cases : int
+        number of (dice, lock) cases in each rules microbenchmark repeat
+    steps : int
+        number of env steps in each step benchmark repeat
+    games : int
+        number of games in each play_game benchmark repeat
+    players : int
+        number of RandomPlayers in the play_game benchmark, and of players in the async_vector benchmark
+    vector_envs : int
+        number of environment subprocesses in the async_vector benchmark, which steps each of them
+        steps // vector_envs times per repeat. 0 skips it
+
+    Returns
+    -------
+    dict
+        the parameters, environment details and results, ready to be dumped as JSON
+    """
+    results = {
+        **bench_rules(seed, repeat, warmup, cases),
+        "env_step": bench_env_step(seed, repeat, warmup, steps),
+        "play_game": bench_play_game(seed, repeat, warmup, games, players),
+    }
+    if vector_envs:
+        results["async_vector"] = bench_async_vector(seed, repeat, warmup, max(steps // vector_envs, 1), vector_envs, players)
+    return {
+        "parameters": {"seed": seed, "repeat": repeat, "warmup": warmup, "cases": cases, "steps": steps, "games": games, "players": players, "vector_envs": vector_envs},
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "gymnasium": gym.__version__, "platform": platform.platform()},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark the Farkle rules, environment and controller")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--cases", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--players", type=int, default=1)
+    parser.add_argument("--vector-envs", type=int, default=4, help="number of AsyncVectorEnv subprocesses, 0 to skip that benchmark")
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if omitted")
+    args = parser.parse_args()
+
+    results = run(args.seed, args.repeat, args.warmup, args.cases, args.steps, args.games, args.players, args.vector_envs)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
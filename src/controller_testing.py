@@ -1,3 +1,4 @@
+import time
 import gymnasium as gym
 import numpy as np
 import testing
@@ -10,8 +11,9 @@ class FarkleController:
     dice_str = utility.get_dice_strings()
     lock_str = utility.get_lock_strings()
 
+    logger = utility.get_logger("controller", "CONTROLLER")
 
-    def __init__(self, env, players, agent_player_num = 0):
+    def __init__(self, env, players, agent_player_num = 0, render_mode = None, recorder = None, profile = False):
         """
         initializes the FarkleController class
 
@@ -23,14 +25,35 @@ class FarkleController:
             a list of player objects
         agent_player_num: int
             the index in the players of the agent that is training
+        render_mode: str, optional
+            "human" to log the game and print every action to stdout, None to stay silent
+        recorder: GameRecorder, optional
+            records every game played, see game_record.py
+        profile: bool
+            whether to time the decisions of each player, see stats
         """
         assert agent_player_num < len(players)
         self._env = env
         self.players = players
         self.agent_player_num = agent_player_num # TODO: can we get rid of this?
+        self.render_mode = render_mode
+        self.recorder = recorder
+        # [decisions, total nanoseconds, slowest nanoseconds] of each player, None when not profiling
+        self._decision_stats = [[0, 0, 0] for _ in players] if profile else None
 
-    def log(self, string):
-        print(f"CONTROLLER: {string}")
+    @property
+    def env(self):
+        """
+        the FarkleEnv the controller plays
+        """
+        return self._env
+
+    def log(self, string, *args):
+        """
+        logs a message when render_mode is "human", %-formatting string with args only if it is emitted
+        """
+        if self.render_mode == "human":
+            FarkleController.logger.info(string, *args)
 
     def print_action(self, observation, action):
         self.print_dice(observation, action)
@@ -68,6 +91,8 @@ class FarkleController:
         info : dict
             Additional info returned by the environment.
         """
+        if self.recorder is not None:
+            seed = self.recorder.start(seed, self._env.players, self._env.max_points)
         return self._env.reset(seed)
 
     def check_legal(self, action):
@@ -85,14 +110,76 @@ class FarkleController:
         except AssertionError:
             return False
 
+    def action_mask(self):
+        return self._env.action_mask()
+
+    def _record_decision(self, turn, elapsed):
+        record = self._decision_stats[turn]
+        record[0] += 1
+        record[1] += elapsed
+        record[2] = max(record[2], elapsed)
+
+    def stats(self):
+        """
+        returns the decision latency of each player since the controller was created or reset_stats,
+        as a list of {"calls", "total_ns", "mean_ns", "max_ns"}. empty when not profiling.
+        the environment's own phases are timed by FarkleEnv.stats
+        """
+        if self._decision_stats is None:
+            return []
+        return [{"calls": calls, "total_ns": total, "mean_ns": total / calls if calls else 0.0, "max_ns": slowest} for calls, total, slowest in self._decision_stats]
+
+    def reset_stats(self):
+        if self._decision_stats is not None:
+            for record in self._decision_stats:
+                record[:] = [0, 0, 0]
+
     def _farkle_step(self):
-        self.log(f"Acknowledging farkle.")
+        self.log("Acknowledging farkle.")
+        if self.recorder is not None:
+            self.recorder.acknowledge_farkle()
         return self._env.acknowledge_farkle()
 
     def _bank_step(self):
-        self.log(f"Acknowledging bank.")
+        self.log("Acknowledging bank.")
+        if self.recorder is not None:
+            self.recorder.acknowledge_bank()
         return self._env.acknowledge_bank()
 
+    def _advanced_turn_updates(self, player, reward, info):
+        """
+        Handles a turn the environment ended and moved on from in auto_advance mode, in place of _farkle_step
+        and _bank_step, as well as the turns it skipped because they farkled off the bat.
+
+        Returns
+        -------
+        list[tuple]
+            (player, observation, reward) of each update to send, the same ones as without auto_advance:
+            the observation the turn ended on for its player, and for each player whose turn was skipped,
+            the observation it farkled on and -1
+        """
+        updates = []
+        if player is not None:
+            final_observation = info["final_observation"]
+            turn = final_observation["turn"]
+            if info["turn_farkled"]:
+                self.log("Player %s farkled! They would have got %s points. They remain at %s points.", turn, final_observation["points_this_turn"], final_observation["player_points"][turn])
+            else:
+                self.log("Player %s banked! They got %s points this turn, bringing them to a total of %s points.", turn, final_observation["points_this_turn"], final_observation["player_points"][turn])
+            if self.recorder is not None:
+                # recorded as the acknowledgement it replaces, so the game replays without auto_advance
+                if info["turn_farkled"]:
+                    self.recorder.acknowledge_farkle()
+                else:
+                    self.recorder.acknowledge_bank()
+            updates.append((player, final_observation, reward))
+        for skipped, skipped_observation in zip(info["skipped_turns"], info["skipped_observations"]):
+            self.log("Player %s farkled off the bat! Sending reward to player.", skipped)
+            if self.recorder is not None:
+                self.recorder.acknowledge_farkle()
+            updates.append((self.players[skipped], skipped_observation, -1))
+        return updates
+
     def play_turn(self, player, observation, info, reward, terminated, truncated):
         """
         Play a full turn for a given player.
@@ -129,7 +216,7 @@ class FarkleController:
 
         if info["farkle"]:
             assert reward == -1
-            self.log(f"Player {observation["turn"]} farkled off the bat! Sending reward to player.")
+            self.log("Player %s farkled off the bat! Sending reward to player.", observation["turn"])
             # the player farkled off the bat
             player.update(observation, reward)
             # we prompt the environment to move to a new round for the next player's turn
@@ -138,27 +225,40 @@ class FarkleController:
         action = {"bank": False}
         while not info["farkle"] and not action["bank"] and info["winner"] == -1 and not terminated and not truncated:
             assert reward == 0
-            self.log(f"Prompting player {observation["turn"]} to play!")
-            lock, bank = player.play(observation) # prompt current player to play
+            self.log("Prompting player %s to play!", observation["turn"])
+            if self._decision_stats is None:
+                lock, bank = player.play(observation) # prompt current player to play
+            else:
+                start = time.perf_counter_ns()
+                lock, bank = player.play(observation)
+                self._record_decision(observation["turn"], time.perf_counter_ns() - start)
             action = {"lock": lock, "bank": bank}
-            self.print_action(observation, action)
+            if self.render_mode == "human":
+                self.print_action(observation, action)
+            if self.recorder is not None:
+                self.recorder.step(action)
             observation, reward, terminated, truncated, info = self._env.step(action)
-            self.log(f"Sending reward of {reward} to player {observation["turn"]}.")
+            if info.get("turn_ended") and not terminated:
+                # the environment is in auto_advance mode, and already started the next turn
+                for update_player, update_observation, update_reward in self._advanced_turn_updates(player, reward, info):
+                    update_player.update(update_observation, update_reward)
+                return observation, reward, terminated, truncated, info
+            self.log("Sending reward of %s to player %s.", reward, observation["turn"])
             player.update(observation, reward)
 
         assert not truncated
 
         if terminated:
             assert info["winner"] != -1
-            self.log(f"Player {observation["turn"]} won! They got {observation["points_this_turn"]} points this turn, bringing them to a total of {observation["player_points"][observation["turn"]]} points.")
+            self.log("Player %s won! They got %s points this turn, bringing them to a total of %s points.", observation["turn"], observation["points_this_turn"], observation["player_points"][observation["turn"]])
             return observation, reward, terminated, truncated, info
 
         if info["farkle"]:
-            self.log(f"Player {observation["turn"]} farkled! They would have got {observation["points_this_turn"]} points. They remain at {observation["player_points"][observation["turn"]]} points.")
+            self.log("Player %s farkled! They would have got %s points. They remain at %s points.", observation["turn"], observation["points_this_turn"], observation["player_points"][observation["turn"]])
             return self._farkle_step()
         elif action["bank"]:
             assert "lock" in action
-            self.log(f"Player {observation["turn"]} banked! They got {observation["points_this_turn"]} points this turn, bringing them to a total of {observation["player_points"][observation["turn"]]} points.")
+            self.log("Player %s banked! They got %s points this turn, bringing them to a total of %s points.", observation["turn"], observation["points_this_turn"], observation["player_points"][observation["turn"]])
             return self._bank_step()
         else:
             raise Exception()
@@ -176,28 +276,42 @@ class FarkleController:
         -------
         winner : int
             Index of the winning player.
+        turns : int
+            Number of turns played.
+        player_points : np.ndarray
+            Final points of each player.
         """
         observation, info = self._new_game(seed)
         truncated = False
         terminated = False
         reward = -1 if info["farkle"] else 0
         turns = 0 # TODO: only applicable to single player
+        if "skipped_turns" in info:
+            # in auto_advance mode, turns that farkled off the bat are skipped by the environment
+            for update_player, update_observation, update_reward in self._advanced_turn_updates(None, reward, info):
+                update_player.update(update_observation, update_reward)
+            turns += len(info["skipped_turns"])
         total_reward = 0
 
         while info["winner"] == -1 and not truncated and not terminated: # while game is not over TODO: consider truncated or terminated?
             current_player = observation["turn"]
-            self.log(f"Start of player {current_player}'s turn.")
+            self.log("Start of player %s's turn.", current_player)
             observation, reward, terminated, truncated, info = self.play_turn(self.players[observation["turn"]], observation, info, reward, terminated, truncated)
             total_reward += reward
-            turns += 1
+            turns += 1 + len(info.get("skipped_turns", ()))
+            if info.get("turn_ended"):
+                reward = 0
 
-        self.log(f"Winner is player {info['winner']}! It took a total of {turns} turns to win!")
+        self.log("Winner is player %s! It took a total of %s turns to win!", info["winner"], turns)
+        if self.recorder is not None:
+            self.recorder.finish()
+        return info["winner"], turns, observation["player_points"].copy()
 
 
 if __name__ == "__main__":
-    players = [player_testing.RandomPlayer()]
-    env = testing.FarkleEnv()
-    game = FarkleController(env, players)
+    players = [player_testing.RandomPlayer(verbose=True)]
+    env = testing.FarkleEnv(render_mode="human")
+    game = FarkleController(env, players, render_mode="human")
     for player in players:
         player.set_controller(game)
     game.play_game()
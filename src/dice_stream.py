@@ -0,0 +1,95 @@
+import copy
+import numpy as np
+
+
+class DiceStream:
+    """
+    Hands out dice rolls drawn in large blocks from a np.random.Generator.
+
+    Drawing one block of rolls at a time replaces sampling a fresh array from the observation
+    space for every roll. Rolls are handed out in order, so a stream built on a generator with
+    a given seed always produces the same dice.
+
+    A block is never written to once drawn: when it runs out, a new one is allocated and the
+    rest of the old one is dropped. Arrays returned by roll() therefore stay valid, but they
+    are views into the block and must be copied before being modified.
+    """
+
+    def __init__(self, generator, block_size = 1 << 14):
+        """
+        Parameters
+        ----------
+        generator : np.random.Generator
+            the generator the rolls are drawn from
+        block_size : int
+            number of die rolls drawn at once
+        """
+        self._generator = generator
+        self._block_size = block_size
+        self._block = np.empty(0, dtype=np.int64)
+        self._position = 0
+        # state of the generator right after the current block was drawn, see get_state
+        self._generator_state = generator.bit_generator.state
+
+    def _refill(self):
+        self._block = self._generator.integers(1, 7, size=self._block_size, dtype=np.int64)
+        self._block.flags.writeable = False
+        self._position = 0
+        self._generator_state = self._generator.bit_generator.state
+
+    def roll(self, dice):
+        """
+        rolls a number of dice
+
+        Parameters
+        ----------
+        dice : int
+            number of dice to roll
+
+        Returns
+        -------
+        np.ndarray
+            read-only view of the values of the dice rolled
+        """
+        if self._position + dice > len(self._block):
+            self._refill()
+        start = self._position
+        self._position += dice
+        return self._block[start:self._position]
+
+    def get_state(self):
+        """
+        returns the position of the stream, to restore with set_state.
+
+        Blocks are never written to, so the state only refers to the current block rather than
+        copying it, along with the state the generator was left in when the block was drawn.
+        Taking a snapshot is therefore free, and restoring one only touches the generator
+        if a new block was drawn since.
+
+        Returns
+        -------
+        tuple
+            (block, position in the block, generator state after drawing the block)
+        """
+        return self._block, self._position, self._generator_state
+
+    def set_state(self, state):
+        """
+        restores a position returned by get_state, so the same rolls are handed out again from there
+        """
+        block, position, generator_state = state
+        if block is not self._block:
+            self._block = block
+            self._generator.bit_generator.state = generator_state
+            self._generator_state = generator_state
+        self._position = position
+
+    def clone(self):
+        """
+        returns a copy of the stream with its own generator, that hands out the same rolls as this one from now on
+        """
+        generator = np.random.Generator(type(self._generator.bit_generator)())
+        generator.bit_generator.state = self._generator.bit_generator.state
+        stream = copy.copy(self)
+        stream._generator = generator
+        return stream
@@ -0,0 +1,265 @@
+import argparse
+import functools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import solver
+
+# win probabilities are stored as fixed point numbers in [0, WIN_SCALE]
+WIN_SCALE = np.iinfo(np.uint16).max
+
+
+def grid_size(max_points, granularity):
+    """
+    returns the number of score units below max_points, S in the docstring of solve
+    """
+    return -(-max_points // granularity)
+
+def to_units(points, granularity):
+    """
+    converts points to score units of the given granularity, rounding to the nearest unit.
+    a scoring lock is always worth at least one unit, so every lock still moves the game forward
+    """
+    points = np.asarray(points)
+    return np.where(points > 0, np.maximum(1, np.rint(points / granularity)), 0).astype(np.int64)
+
+@functools.lru_cache(maxsize=None)
+def _tables(granularity):
+    """
+    the rolls and legal locks of solver._roll_tables, with points converted to units of granularity,
+    and the legal locks of each number of dice flattened into one list, grouped by roll
+    """
+    tables = [None]
+    for dice in range(1, 7):
+        table = dict(solver._roll_tables(dice))
+        table["points"] = to_units(table["points"] * solver.POINT_UNIT, granularity)
+        table["best_points"] = table["points"].max(axis=1)
+        legal = table["locks"] >= 0
+        table["scoring"] = legal[:, 0]
+        table["lock_points"] = table["points"][legal]
+        table["lock_dice_after"] = table["dice_after"][legal]
+        # offset of the first lock of each scoring roll in the flattened lists, for np.maximum.reduceat
+        table["segments"] = np.concatenate([[0], np.cumsum(legal.sum(axis=1))])[:-1][table["scoring"]]
+        table["segment_lengths"] = legal.sum(axis=1)[table["scoring"]]
+        tables.append(table)
+    return tables
+
+def _turn_values(pairs, start, size, granularity):
+    """
+    Solves the turn of the player to move, for a batch of score pairs.
+
+    Parameters
+    ----------
+    pairs : np.ndarray
+        (B, 2) array of (score of the player to move, score of the opponent), in units,
+        sorted by increasing score of the player to move
+    start : np.ndarray
+        (S, S) current estimate of the win probability of the player to move at the start of a turn
+    size : int
+        S, the number of score units below max_points
+    granularity : int
+        points per score unit
+
+    Returns
+    -------
+    values : np.ndarray
+        (B, S, 7) array, entry [b, t, n] is the win probability of the player to move in pair b,
+        with t units set aside this turn, before rolling n dice. 1 where the player has already won
+    slope : np.ndarray
+        (B,) derivative of values[:, 0, 6] with respect to the win probability left after a farkle,
+        1 - start[opponent, score], under the choices made. it is the chance the turn ends in a farkle
+    """
+    tables = _tables(granularity)
+    threshold = -(-solver.BANK_THRESHOLD // granularity)
+    most_points = max(int(table["points"].max()) for table in tables[1:])
+    score, opponent = pairs[:, 0], pairs[:, 1]
+    width = size + most_points + 1
+
+    # values[b, t * 7 + n], flattened so that looking up the states after every lock is a single take
+    values = np.ones((len(pairs), width * 7))
+    slopes = np.zeros((len(pairs), width * 7))
+    # win probability after banking to a score, indexed by that score
+    banked = np.ones((len(pairs), width))
+    banked[:, :size] = 1 - start[opponent, :]
+    farkle = 1 - start[opponent, score]
+
+    for t in range(size - 1 - int(score[0]), -1, -1):
+        # only pairs that have not won yet with t set aside need solving. pairs are sorted by score, so they come first
+        playing = int(np.searchsorted(score, size - t))
+        for dice in range(1, 7):
+            table = tables[dice]
+            after = (t + table["lock_points"]) * 7 + table["lock_dice_after"]
+            carry_on = np.take(values[:playing], after, axis=1)
+            best = np.maximum.reduceat(carry_on, table["segments"], axis=1)
+            # the slope of the best lock of each roll, ties broken towards the larger slope
+            is_best = carry_on == np.repeat(best, table["segment_lengths"], axis=1)
+            carry_on_slope = np.maximum.reduceat(np.where(is_best, np.take(slopes[:playing], after, axis=1), -np.inf), table["segments"], axis=1)
+
+            # scores past the end of the game are all won, so they share the last column
+            new_score = np.minimum(score[:playing, None] + t + table["best_points"][None, table["scoring"]], size)
+            bank = np.where(new_score >= threshold, np.take_along_axis(banked[:playing], new_score, axis=1), -np.inf)
+            banking = bank >= best
+
+            # banking moves to another diagonal, so only carrying on and farkling depend on the farkle value
+            probability = table["probability"]
+            scoring = table["scoring"]
+            farkle_probability = probability[~scoring].sum()
+            values[:playing, t * 7 + dice] = np.where(banking, bank, best) @ probability[scoring] + farkle[:playing] * farkle_probability
+            slopes[:playing, t * 7 + dice] = np.where(banking, 0, carry_on_slope) @ probability[scoring] + farkle_probability
+
+    return values.reshape(len(pairs), width, 7)[:, :size, :], slopes[:, 6]
+
+def _turn_values_job(job):
+    return _turn_values(*job)
+
+def _load_progress(path, max_points, granularity):
+    """
+    returns the saved progress of a solve of the same game in path, or None if there is none
+    """
+    try:
+        with open(os.path.join(path, "progress.json")) as f:
+            progress = json.load(f)
+    except FileNotFoundError:
+        return None
+    if progress["max_points"] != max_points or progress["granularity"] != granularity:
+        raise ValueError(f"{path} holds a solve for max_points={progress['max_points']}, granularity={progress['granularity']}")
+    return progress
+
+def solve(path, max_points = 10000, granularity = 50, workers = 1, tolerance = 1e-9, max_iterations = 100, log = None):
+    """
+    Computes the probability of winning every state of a two-player game, by value iteration over the score grid.
+
+    A state is the score i of the player to move, the score j of their opponent, the points t
+    they have set aside this turn and the number of dice n they are about to roll, all points
+    in units of granularity (a multiple of 50, coarser grids round lock points to the nearest
+    unit). The player to move picks the lock and bank choice with the best chance to win:
+    banking to score i' hands the opponent a turn from (j, i'), farkling hands them (j, i).
+
+    Banking always raises the mover's score, so the start of a turn at (i, j) only depends on
+    pairs with a larger total i + j, and on (j, i) through farkles. Pairs are solved one
+    diagonal of equal i + j at a time, from the end of the game backwards, iterating within
+    a diagonal until the win probabilities move by less than tolerance. The turns of the pairs
+    of a diagonal are solved in parallel across worker processes.
+
+    Progress is checkpointed to path after every diagonal, and an interrupted solve resumes from there.
+
+    Parameters
+    ----------
+    path : str
+        directory the tables and checkpoints are written to
+    max_points : int
+        number of points to win the game
+    granularity : int
+        points per score unit
+    workers : int
+        number of worker processes
+    tolerance : float
+        convergence threshold of the iterations within a diagonal
+    max_iterations : int
+        most iterations run on a diagonal
+    log : callable, optional
+        called with a progress message after every diagonal, e.g. print. silent if None
+
+    Writes
+    ------
+    win.npy
+        uint16 array of shape (S, S, S, 7), entry [i, j, t, n] is the win probability of the
+        state, as a fraction of WIN_SCALE. entries where i + t >= S are won states
+    start.npy
+        float64 array of shape (S, S), the win probability of the player to move at the start of a turn
+    progress.json
+        the parameters of the solve, and the next diagonal to solve (-1 once done)
+    """
+    size = grid_size(max_points, granularity)
+    os.makedirs(path, exist_ok=True)
+    win_path = os.path.join(path, "win.npy")
+    start_path = os.path.join(path, "start.npy")
+
+    progress = _load_progress(path, max_points, granularity)
+    if progress is None:
+        progress = {"max_points": max_points, "granularity": granularity, "next_diagonal": 2 * size - 2}
+        win = np.lib.format.open_memmap(win_path, mode="w+", dtype=np.uint16, shape=(size, size, size, 7))
+        start = np.full((size, size), 0.5)
+    else:
+        win = np.load(win_path, mmap_mode="r+")
+        start = np.load(start_path)
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for diagonal in range(progress["next_diagonal"], -1, -1):
+            began = time.perf_counter()
+            score = np.arange(max(0, diagonal - size + 1), min(diagonal, size - 1) + 1)
+            pairs = np.stack([score, diagonal - score], axis=1)
+            chunks = np.array_split(pairs, min(len(pairs), workers))
+
+            for iteration in range(max_iterations):
+                jobs = [(chunk, start, size, granularity) for chunk in chunks]
+                if executor is None:
+                    results = [_turn_values_job(job) for job in jobs]
+                else:
+                    results = list(executor.map(_turn_values_job, jobs))
+                values = np.concatenate([result[0] for result in results])
+                slope = np.concatenate([result[1] for result in results])
+
+                # with the choices fixed, the start of a turn is linear in the value of farkling:
+                # x[i, j] = offset[i, j] + slope[i, j] * (1 - x[j, i]). pairs (i, j) and (j, i) are
+                # on the same diagonal, and in reverse order in pairs, so each such system is solved exactly,
+                # like a policy iteration step
+                value = values[:, 0, 6]
+                offset = value - slope * (1 - start[pairs[:, 1], pairs[:, 0]])
+                new_start = (offset + slope * (1 - offset[::-1] - slope[::-1])) / (1 - slope * slope[::-1])
+
+                previous = start[pairs[:, 0], pairs[:, 1]]
+                start[pairs[:, 0], pairs[:, 1]] = new_start
+                if np.abs(new_start - previous).max() < tolerance:
+                    break
+
+            win[pairs[:, 0], pairs[:, 1]] = np.rint(values * WIN_SCALE).astype(np.uint16)
+            win.flush()
+            np.save(start_path, start)
+            progress["next_diagonal"] = diagonal - 1
+            with open(os.path.join(path, "progress.json"), "w") as f:
+                json.dump(progress, f)
+            if log is not None:
+                log(f"diagonal {diagonal}: {len(pairs)} pairs, {iteration + 1} iterations, {time.perf_counter() - began:.2f}s")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+def load(path):
+    """
+    Memory-maps the tables written by a finished solve().
+
+    Returns
+    -------
+    win : np.ndarray
+        read-only memory-mapped win probabilities, see solve
+    start : np.ndarray
+        win probabilities at the start of a turn, see solve
+    max_points : int
+        number of points to win the game the tables were solved for
+    granularity : int
+        points per score unit
+    """
+    with open(os.path.join(path, "progress.json")) as f:
+        progress = json.load(f)
+    if progress["next_diagonal"] >= 0:
+        raise ValueError(f"the solve in {path} is not finished, run solve() again to resume it")
+    win = np.load(os.path.join(path, "win.npy"), mmap_mode="r")
+    start = np.load(os.path.join(path, "start.npy"))
+    return win, start, progress["max_points"], progress["granularity"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="solve the win probabilities of two-player Farkle")
+    parser.add_argument("--max-points", type=int, default=10000)
+    parser.add_argument("--granularity", type=int, default=50, help="points per score unit, a multiple of 50")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="endgame", help="directory to write the tables and checkpoints to")
+    args = parser.parse_args()
+
+    solve(args.output, args.max_points, args.granularity, args.workers, log=print)
+    win, start, _, _ = load(args.output)
+    print(f"first player's chance to win: {start[0, 0]:.4f}")
@@ -0,0 +1,265 @@
+import argparse
+import struct
+import numpy as np
+from testing import FarkleEnv
+
+# event codes. a step is one byte, bank << 6 | lock mask, where bit i locks die i
+ACKNOWLEDGE_FARKLE = 0x80
+ACKNOWLEDGE_BANK = 0x81
+
+# magic, format version, players, max_points, seed, number of events
+_HEADER = struct.Struct("<4sBBIQI")
+_MAGIC = b"FRKL"
+_VERSION = 1
+
+
+def encode_step(action):
+    """
+    returns the event code of a step with an action dict, see FarkleEnv.step
+    """
+    mask = 0
+    for i, locked in enumerate(action["lock"]):
+        if locked:
+            mask |= 1 << i
+    return (bool(action["bank"]) << 6) | mask
+
+def decode_step(event, dice = 6):
+    """
+    returns the action dict of the step with an event code
+    """
+    return {"bank": bool(event >> 6 & 1), "lock": FarkleEnv.mask_to_lock(event & 0x3F, dice)}
+
+
+class GameRecord:
+    """
+    Compact binary record of a game: the seed the environment was reset with, the game's
+    settings, and one byte per call to FarkleEnv.step, acknowledge_farkle and acknowledge_bank.
+    Replaying these calls from the seed reproduces the game exactly, see GameReplayer.
+
+    The serialized record is a 20 byte header followed by the events, so records can be
+    appended to the same file and read back one after the other with read_records.
+    """
+
+    def __init__(self, seed, players, max_points, events = b""):
+        """
+        Parameters
+        ----------
+        seed : int
+            seed the environment was reset with at the start of the game
+        players : int
+            number of players
+        max_points : int
+            number of points to win the game
+        events : bytes
+            the event code of each call, in order
+        """
+        self.seed = seed
+        self.players = players
+        self.max_points = max_points
+        self.events = bytearray(events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def to_bytes(self):
+        return _HEADER.pack(_MAGIC, _VERSION, self.players, self.max_points, self.seed, len(self.events)) + bytes(self.events)
+
+    @staticmethod
+    def from_bytes(data, offset = 0):
+        """
+        reads a record from data at offset
+
+        Returns
+        -------
+        record : GameRecord
+            the record
+        end : int
+            offset of the end of the record in data
+        """
+        magic, version, players, max_points, seed, count = _HEADER.unpack_from(data, offset)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"not a version {_VERSION} game record at offset {offset}")
+        start = offset + _HEADER.size
+        return GameRecord(seed, players, max_points, data[start:start + count]), start + count
+
+    def save(self, path):
+        """
+        appends the record to the file at path
+        """
+        with open(path, "ab") as f:
+            f.write(self.to_bytes())
+
+def read_records(path):
+    """
+    returns every record of a file written by GameRecord.save or a GameRecorder, in order
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    records = []
+    offset = 0
+    while offset < len(data):
+        record, offset = GameRecord.from_bytes(data, offset)
+        records.append(record)
+    return records
+
+
+class GameRecorder:
+    """
+    Records the games played by a FarkleController it is passed to.
+
+    Every game needs a seed to be reproducible, so the controller asks the recorder for one
+    when play_game is not given any.
+    """
+
+    def __init__(self, path = None):
+        """
+        Parameters
+        ----------
+        path : str, optional
+            file every finished record is appended to. records are only kept in memory if None
+        """
+        self.path = path
+        # the finished records, only kept if there is no path
+        self.records = []
+        # the record of the game being played
+        self.record = None
+
+    def start(self, seed, players, max_points):
+        """
+        starts the record of a new game, returning the seed to reset the environment with
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(2, dtype=np.uint64)[0])
+        self.record = GameRecord(seed, players, max_points)
+        return seed
+
+    def step(self, action):
+        self.record.events.append(encode_step(action))
+
+    def acknowledge_farkle(self):
+        self.record.events.append(ACKNOWLEDGE_FARKLE)
+
+    def acknowledge_bank(self):
+        self.record.events.append(ACKNOWLEDGE_BANK)
+
+    def finish(self):
+        """
+        finishes the record of the game, returning it
+        """
+        record = self.record
+        if self.path is None:
+            self.records.append(record)
+        else:
+            record.save(self.path)
+        self.record = None
+        return record
+
+
+class GameReplayer:
+    """
+    Rebuilds any intermediate state of a recorded game, by replaying its calls on a FarkleEnv
+    with rendering off.
+
+    Turn k starts after the k-th acknowledge_farkle or acknowledge_bank. The first replay up
+    to a turn snapshots the state at the start of every turn it goes through (see
+    FarkleEnv.get_state), so going back to one of them later costs a single set_state.
+    """
+
+    def __init__(self, record):
+        """
+        Parameters
+        ----------
+        record : GameRecord
+            the game to replay
+        """
+        self.record = record
+        self.env = FarkleEnv(players=record.players, max_points=record.max_points)
+        # event index and snapshot at the start of each turn reached so far
+        self._turn_starts = []
+        self.reset()
+
+    def reset(self):
+        """
+        goes back to the start of the game, returning its first observation and info
+        """
+        observation, info = self.env.reset(seed=self.record.seed)
+        # index of the next event to replay, and number of the current turn
+        self.position = 0
+        self.turn = 0
+        if not self._turn_starts:
+            self._turn_starts.append((0, self.env.get_state()))
+        return observation, info
+
+    def step(self):
+        """
+        replays the next event
+
+        Returns
+        -------
+        tuple
+            what the replayed env call returned
+        """
+        event = self.record.events[self.position]
+        self.position += 1
+        if event == ACKNOWLEDGE_FARKLE:
+            result = self.env.acknowledge_farkle()
+        elif event == ACKNOWLEDGE_BANK:
+            result = self.env.acknowledge_bank()
+        else:
+            return self.env.step(decode_step(event, self.env.dice))
+
+        self.turn += 1
+        if self.turn == len(self._turn_starts):
+            self._turn_starts.append((self.position, self.env.get_state()))
+        return result
+
+    def seek(self, position):
+        """
+        replays the game up to event index position, i.e. until position events have been replayed
+        """
+        assert 0 <= position <= len(self.record)
+        if position < self.position:
+            # restart from the latest turn start known to come before position
+            turn = max(k for k, (start, _) in enumerate(self._turn_starts) if start <= position)
+            self.position, state = self._turn_starts[turn]
+            self.env.set_state(state)
+            self.turn = turn
+        while self.position < position:
+            self.step()
+        return self.env._get_obs()
+
+    def seek_turn(self, turn):
+        """
+        replays the game up to the start of a turn, counting from 0
+
+        Returns
+        -------
+        dict
+            the observation at the start of the turn
+        """
+        if turn < len(self._turn_starts):
+            self.position, state = self._turn_starts[turn]
+            self.env.set_state(state)
+            self.turn = turn
+            return self.env._get_obs()
+
+        self.seek(self._turn_starts[-1][0])
+        while self.turn < turn:
+            if self.position == len(self.record):
+                raise IndexError(f"the game only lasted {self.turn + 1} turns")
+            self.step()
+        return self.env._get_obs()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="show the state of recorded Farkle games at the start of a turn")
+    parser.add_argument("path", help="file of game records")
+    parser.add_argument("--game", type=int, default=0, help="index of the game in the file")
+    parser.add_argument("--turn", type=int, default=0)
+    args = parser.parse_args()
+
+    replayer = GameReplayer(read_records(args.path)[args.game])
+    replayer.seek_turn(args.turn)
+    replayer.env.render_mode = "ansi"
+    print(f"player points: {replayer.env._player_points}, turn of player {replayer.env._turn}")
+    print(replayer.env.render())
@@ -1,7 +1,14 @@
+import bisect
+import functools
+import math
+import time
+from collections import OrderedDict
 import gymnasium as gym
 import numpy as np
 import random
-import copy
+import utility
+import solver
+import endgame_solver
 from testing import FarkleEnv
 
 # helper functions
@@ -33,36 +40,27 @@ def get_legal_lock_combinations(observation):
 
     return get_legal_lock_combinations_wrapped(dice_values, dice_locked)
 
-def _helper_flip_lock(string, dice_values, dice_locked):
+def get_legal_lock_masks(observation):
     """
-    returns a new array of which dice are locked after the player has attempted to lock a combination of dice
+    Determine all legal combinations of dice to lock, as bit masks.
 
     Parameters
     ----------
-    string: string
-        a string indicating the values of the dice the player is trying to lock
-    dice_values: array-like
-        an array of integers indicating the value of each die in each position
-    dice_locked: array-like
-        0 if the die is unlocked, 1 otherwise
+    observation : dict
+        Observation from the Farkle environment. Must contain
+        "dice_locked" and "dice_values".
 
     Returns
     -------
-    new_locked: array-like
-        0 if the die was previously unlocked, but we are locking it, 1 otherwise
+    masks : tuple[int]
+        The legal lock masks, where bit i is set if die i is locked.
+        See FarkleEnv.get_legal_lock_masks.
     """
-    new_locked = [x for x in dice_locked]
-    for char in string:
-        x = int(char)
-        for i, value in enumerate(dice_values): # we find a dice of matching value and undo the lock
-            if value == x and new_locked[i] == 0:
-                new_locked[i] = 1
-                break
-    return new_locked
+    return FarkleEnv.get_legal_lock_masks(observation["dice_values"], observation["dice_locked"])
 
 def get_legal_lock_combinations_wrapped(dice_values, dice_locked):
     """
-    Recursive helper to enumerate all possible legal lock combinations.
+    Enumerate all possible legal lock combinations.
 
     Parameters
     ----------
@@ -74,52 +72,10 @@ def get_legal_lock_combinations_wrapped(dice_values, dice_locked):
     Returns
     -------
     combinations : list[list[int]]
-        All possible index sets of dice that may be locked,
-        constructed recursively from valid scoring subsets.
+        All index sets of unlocked dice that are made up entirely of scoring
+        combinations, looked up from the cached FarkleEnv.get_legal_lock_masks.
     """
-    unlocked = []
-    unlocked_indices = []
-    num_unlocked = 0
-    for i, (lock, die) in enumerate(zip(dice_locked, dice_values)):
-        if not lock:
-            unlocked.append(die)
-            unlocked_indices.append(i)
-            num_unlocked += 1
-    # sort the unlocked dice, but maintain order of indices of those dice
-    order = sorted(range(len(unlocked)), key=lambda i: unlocked[i])
-    unlocked = [str(unlocked[i]) for i in order]
-    unlocked_indices = [unlocked_indices[i] for i in order]
-    combinations = []
-    string = "".join(unlocked)
-    for i in range(1, num_unlocked+1):
-        for dict in FarkleEnv.combinations[i]:
-            for key in dict.keys():
-                index = string.find(key)
-                if index == -1: continue
-                curr_combinations = []
-                curr_combinations.append(unlocked_indices[index:index+len(key)]) # append the indices that we are allowed to lock
-                # we get the possible combinations of dice to lock without the dice that we locked in the current recursion level
-                additional = get_legal_lock_combinations_wrapped(dice_values, _helper_flip_lock(key, dice_values, dice_locked)) #TODO: does this work?
-                curr_combinations.extend(additional)
-                for combo in curr_combinations:
-                    if len(set(combo)) != len(combo):
-                        raise Exception("badness")
-                # we get the combinations formed by adding the current combination to the remaining combinations found by recursing
-                additional_with_original = copy.deepcopy(additional)
-                for combo in additional_with_original:
-                    assert unlocked_indices[index:index+len(key)] not in combo
-                    combo.extend(unlocked_indices[index:index+len(key)])
-                curr_combinations.extend(additional_with_original)
-                for combo in curr_combinations:
-                    if len(set(combo)) != len(combo):
-                        raise Exception("badness two")
-                # sort and do not add duplicates
-                for combo in curr_combinations:
-                    combo.sort()
-                    if combo not in combinations:
-                        combinations.append(combo)
-
-    return combinations
+    return [[i for i in range(len(dice_values)) if mask >> i & 1] for mask in FarkleEnv.get_legal_lock_masks(dice_values, dice_locked)]
 
 def check_lock_legal(lock, bank, controller):
     action = {"lock": lock, "bank": bank}
@@ -134,6 +90,40 @@ def convert_lock_indices_to_list(indices, observation):
     lock[indices] = 1
     return lock
 
+def get_unlocked_multiset_rank(observation):
+    """
+    Returns the rank in FarkleEnv._multisets of the values of the unlocked dice.
+    """
+    index = 0
+    for value, locked in zip(observation["dice_values"], observation["dice_locked"]):
+        if not locked:
+            index += FarkleEnv._die_weight[value]
+    return int(FarkleEnv._multiset_rank[index])
+
+def convert_multiset_to_lock(counts, observation):
+    """
+    Picks unlocked dice matching a multiset of values to lock.
+
+    Parameters
+    ----------
+    counts : array-like
+        entry v-1 is the number of dice of value v to lock
+    observation : dict
+        Observation of the Farkle environment.
+
+    Returns
+    -------
+    lock : np.ndarray
+        1 in indices of the dice to lock, 0 otherwise
+    """
+    remaining = list(counts)
+    lock = np.zeros(len(observation["dice_values"]), dtype=int)
+    for i, (value, locked) in enumerate(zip(observation["dice_values"], observation["dice_locked"])):
+        if not locked and remaining[value - 1]:
+            remaining[value - 1] -= 1
+            lock[i] = 1
+    return lock
+
 def choose_random_action(observation, controller):
     """
     Select a random action (lock and/or bank) for the player.
@@ -144,8 +134,8 @@ def choose_random_action(observation, controller):
         Observation of the Farkle environment.
     controller : object
         The controller that enforces rules. Must provide:
-            - check_lock_legal(action: dict) -> bool
-            - check_bank_legal(action: dict) -> bool
+            - action_mask() -> np.ndarray
+                legal actions, as returned by FarkleEnv.action_mask
 
     Returns
     -------
@@ -176,39 +166,31 @@ def choose_random_action(observation, controller):
         a boolean indicating if the action is to bank
     """
     # bank = np.random.choice([True, False])
-    possible_actions = []
-    for lock in get_legal_lock_combinations(observation):
-        lock = convert_lock_indices_to_list(lock, observation)
-        possible_actions.append((False, lock))
-        if check_bank_legal(lock, True, controller):
-            possible_actions.append(True, lock)
-
-    lock = np.zeros(len(observation["dice_values"])
-    if check_bank_legal(lock, True, controller):
-        possible_actions.append(True, lock)
-
-    bank, lock = random.choice(possible_action)
-    # try:
-    #     lock = random.choice(get_legal_lock_combinations(observation))
-    #     lock = convert_lock_indices_to_list(lock, observation)
-    # except IndexError:
-    #     lock = np.zeros(len(observation["dice_values"]))
-    #
-    # if not check_bank_legal(lock, bank, controller):
-    #     bank = False
-
-    if not check_lock_legal(lock, bank, controller):
-        raise Exception("this is probably bad.")
+    # the random player always locks something before rolling again, so it never picks [0, 0]
+    action_mask = controller.action_mask()
+    action_mask[0, 0] = False
+    possible_actions = np.flatnonzero(action_mask)
+    bank, mask = divmod(int(random.choice(possible_actions)), action_mask.shape[1])
+    lock = FarkleEnv.mask_to_lock(mask, len(observation["dice_values"]))
+    bank = bool(bank)
 
     return lock, bank
 
 class Player:
-    def __init__(self):
+
+    logger = utility.get_logger("player", "PLAYER")
+
+    def __init__(self, verbose = False):
         self.controller = None
-        pass
+        # whether log() writes anything
+        self.verbose = verbose
 
-    def log(self, string):
-        print(f"PLAYER: {string}.")
+    def log(self, string, *args):
+        """
+        logs a message when the player is verbose, %-formatting string with args only if it is emitted
+        """
+        if self.verbose:
+            Player.logger.info(f"{string}.", *args)
  
     def set_controller(self, controller):
         self.controller = controller
@@ -234,29 +216,276 @@ class Player:
     def update(self, observation, reward):
         raise NotImplementedError
 
+@functools.lru_cache(maxsize=None)
+def _canonical_locks():
+    """
+    The legal locks of every multiset of unlocked dice, over the positions of the dice in
+    canonical order (see FarkleEnv.canonical_order). Dice of equal values are interchangeable,
+    so only the lock of the first dice of each value is kept.
+
+    Returns
+    -------
+    legal : np.ndarray
+        (len(FarkleEnv._multisets), 64) bool, entry [r, m] is True if lock mask m is legal for multiset rank r
+    points : np.ndarray
+        (len(FarkleEnv._multisets), 64) points of each legal lock
+    """
+    legal = np.zeros((len(FarkleEnv._multisets), 64), dtype=bool)
+    points = np.zeros((len(FarkleEnv._multisets), 64), dtype=np.int64)
+    for rank, counts in enumerate(FarkleEnv._multisets):
+        values = [value for value in range(1, 7) for _ in range(counts[value - 1])]
+        unlocked = len(values)
+        dice_values = tuple(values + [1] * (6 - unlocked))
+        masks, mask_points = FarkleEnv._get_legal_locks(dice_values, 63 ^ ((1 << unlocked) - 1))
+        for mask, lock_points in zip(masks, mask_points):
+            # a die may only be locked if the one before it of the same value is
+            if all(mask >> (i - 1) & 1 for i in range(1, unlocked) if mask >> i & 1 and values[i] == values[i - 1]):
+                legal[rank, mask] = True
+                points[rank, mask] = lock_points
+    return legal, points
+
 class RLAgent(Player):
-    def __init__(self):
-        pass
+    """
+    Tabular Q-learning agent, learning to make the most points of a turn.
+
+    The Q-table is a dense float32 array of shape (states, 128). A state id packs the rank of
+    the multiset of unlocked dice values, points_this_turn // 50 (capped to point_buckets - 1)
+    and whether the player has banked before, which is all that decides the legal actions and
+    the points a turn can still make. Actions are the indices of DiscreteActionWrapper over
+    the dice in canonical order, bank * 64 + lock mask, so every ordering of the same dice
+    shares its entries. Locking nothing without banking is never chosen.
+
+    A turn is an episode, and its reward is the points it banks, in units of 50: 0 for a
+    farkle. The environment's -1 per turn does not depend on the state of this table, so
+    it would not teach it anything.
+
+    Transitions are gathered into batches of batch_size and applied as one vectorized
+    update. train() learns from a VectorFarkleEnv, thousands of games at a time. A frozen
+    agent only plays, and update ignores what its decisions led to.
+    """
+    def __init__(self, learning_rate = 0.1, discount = 1.0, epsilon = 0.1, batch_size = 256, point_buckets = 64, path = None, verbose = False):
+        """
+        Parameters
+        ----------
+        learning_rate : float
+            step size of the Q-learning updates
+        discount : float
+            discount of the next state's value
+        epsilon : float
+            probability of playing a random legal action, 0 to play greedily
+        batch_size : int
+            number of transitions per update
+        point_buckets : int
+            number of values of points_this_turn // 50 told apart
+        path : str, optional
+            .npy file of a Q-table to start from, see load
+        verbose : bool
+            whether log() writes anything
+        """
+        super().__init__(verbose)
+        self.learning_rate = learning_rate
+        self.discount = discount
+        self.epsilon = epsilon
+        self.batch_size = batch_size
+        self.point_buckets = point_buckets
+
+        lock_legal, lock_points = _canonical_locks()
+        ranks = len(FarkleEnv._multisets)
+        # legal[state id, action], built once for every state
+        bucket = np.arange(point_buckets)[None, :, None, None]
+        started = np.array([False, True])[None, None, :, None]
+        bank_legal = started | (bucket * 50 + lock_points[:, None, None, :] >= solver.BANK_THRESHOLD)
+        lock = np.broadcast_to(lock_legal[:, None, None, :], (ranks, point_buckets, 2, 64))
+        bank = np.broadcast_to(lock_legal[:, None, None, :] | (np.arange(64) == 0), (ranks, point_buckets, 2, 64)) & bank_legal
+        self._legal = np.concatenate([lock, bank], axis=3).reshape(-1, 128)
+        self._legal[:, 0] = False
+
+        self.q = np.zeros((ranks * point_buckets * 2, 128), dtype=np.float32)
+        # whether update stops learning, set by load for a table that cannot be written
+        self.frozen = False
+        if path is not None:
+            self.load(path)
+
+        # transitions waiting for the next update: state, action, reward, next state, done
+        self._batch = [np.zeros(batch_size, dtype=np.int64) for _ in range(2)] + [np.zeros(batch_size)] + [np.zeros(batch_size, dtype=np.int64), np.zeros(batch_size, dtype=bool)]
+        self._batch_size = 0
+        # state id, action and score of the last decision, until update sees what it led to
+        self._pending = None
+
+    def state_ids(self, dice_values, dice_locked, points_this_turn, score):
+        """
+        Returns the state ids of a batch of states.
+
+        Parameters
+        ----------
+        dice_values, dice_locked : np.ndarray
+            (N, 6) dice of each state
+        points_this_turn : np.ndarray
+            (N,) points set aside this turn
+        score : np.ndarray
+            (N,) points of the player to move
+
+        Returns
+        -------
+        np.ndarray
+            (N,) state ids
+        """
+        index = (np.asarray(FarkleEnv._die_weight)[dice_values] * (1 - np.asarray(dice_locked))).sum(axis=1)
+        ranks = FarkleEnv._multiset_rank[index].astype(np.int64)
+        buckets = np.minimum(np.asarray(points_this_turn) // 50, self.point_buckets - 1)
+        return (ranks * self.point_buckets + buckets) * 2 + (np.asarray(score) > 0)
+
+    def choose_actions(self, states, rng):
+        """
+        picks a masked epsilon-greedy action in each state, returning (N,) canonical action indices
+        """
+        legal = self._legal[states]
+        greedy = np.where(legal, self.q[states], -np.inf).argmax(axis=1)
+        explore = rng.random(len(states)) < self.epsilon
+        if explore.any():
+            # the legal action with the largest random key is a uniform pick among them
+            greedy[explore] = np.where(legal[explore], rng.random((np.count_nonzero(explore), 128)), -1).argmax(axis=1)
+        return greedy
+
+    @staticmethod
+    def to_locks(actions, dice_values, dice_locked):
+        """
+        converts canonical action indices into (N, 6) lock arrays over the dice in their actual order,
+        and (N,) bank flags
+        """
+        # canonical position k holds die order[:, k]: unlocked dice by increasing value, then locked dice
+        order = np.argsort(np.asarray(dice_locked) * 8 + np.asarray(dice_values), axis=1, kind="stable")
+        lock = np.zeros(order.shape, dtype=np.int64)
+        np.put_along_axis(lock, order, (actions[:, None] >> np.arange(order.shape[1])) & 1, axis=1)
+        return lock, actions >= 64
+
+    def learn(self, states, actions, rewards, next_states, dones):
+        """
+        Applies one vectorized Q-learning update for a batch of transitions.
+        repeated (state, action) pairs in a batch each move the entry by their own step
+        """
+        if not self.q.flags.writeable:
+            # np.add.at does not check, and crashes writing to a read-only memory map
+            raise ValueError("the Q-table is read-only, load it with mmap_mode=None, \"r+\" or \"c\" to learn")
+        next_legal = self._legal[next_states]
+        next_value = np.where(next_legal, self.q[next_states], -np.inf).max(axis=1)
+        next_value = np.where(dones | ~next_legal.any(axis=1), 0, next_value)
+        targets = rewards + self.discount * next_value
+        np.add.at(self.q, (states, actions), self.learning_rate * (targets - self.q[states, actions]))
+
+    def _remember(self, state, action, reward, next_state, done):
+        for column, value in zip(self._batch, (state, action, reward, next_state, done)):
+            column[self._batch_size] = value
+        self._batch_size += 1
+        if self._batch_size == self.batch_size:
+            self.learn(*self._batch)
+            self._batch_size = 0
 
     def play(self, observation):
-        pass
+        turn = observation["turn"]
+        score = int(observation["player_points"][turn])
+        state = int(self.state_ids([observation["dice_values"]], [observation["dice_locked"]], [observation["points_this_turn"]], [score])[0])
+        legal = np.flatnonzero(self._legal[state])
+        if random.random() < self.epsilon:
+            action = int(random.choice(legal))
+        else:
+            action = int(legal[self.q[state, legal].argmax()])
+
+        self._pending = (state, action, score, turn)
+        lock, bank = RLAgent.to_locks(np.array([action]), [observation["dice_values"]], [observation["dice_locked"]])
+        self.log("RL agent decided to lock %s, bank: %s", lock[0], bool(bank[0]))
+        return lock[0], bool(bank[0])
 
     def update(self, observation, reward):
-        pass
+        if self.frozen:
+            self._pending = None
+            return
+        if self._pending is None:
+            # the turn farkled on its first roll, before any decision
+            return
+        state, action, score, turn = self._pending
+        self._pending = None
+
+        # the turn ended if its points were banked or won, which raised the score, or if it farkled
+        gain = int(observation["player_points"][turn]) - score
+        if gain or reward == -1:
+            self._remember(state, action, gain / 50, state, True)
+        else:
+            next_state = self.state_ids([observation["dice_values"]], [observation["dice_locked"]], [observation["points_this_turn"]], [score])[0]
+            self._remember(state, action, 0, next_state, False)
+
+    def train(self, env, steps, seed = None):
+        """
+        Learns from games of a VectorFarkleEnv, every game choosing and updating at once.
+
+        Parameters
+        ----------
+        env : VectorFarkleEnv
+            the environment, reset by train
+        steps : int
+            number of vector steps, each a transition of every game
+        seed : int, optional
+            seed of the environment and the exploration
+        """
+        rng = np.random.default_rng(seed)
+        observation, info = env.reset(seed=seed)
+        rows = np.arange(env.num_envs)
+        resetting = np.zeros(env.num_envs, dtype=bool)
+        for _ in range(steps):
+            score = observation["player_points"][rows, observation["turn"]]
+            states = self.state_ids(observation["dice_values"], observation["dice_locked"], observation["points_this_turn"], score)
+            actions = self.choose_actions(states, rng)
+            lock, bank = RLAgent.to_locks(actions, observation["dice_values"], observation["dice_locked"])
+            # games reset on this step ignore their action, their state is the one of the game that finished
+            lock[resetting] = 0
+            bank[resetting] = False
+
+            turn = observation["turn"]
+            observation, reward, terminated, truncated, info = env.step({"lock": lock, "bank": bank})
+            gain = observation["player_points"][rows, turn] - score
+            dones = (reward == -1) | terminated
+            next_states = self.state_ids(observation["dice_values"], observation["dice_locked"], observation["points_this_turn"], score)
+            learning = ~resetting & ~truncated
+            self.learn(states[learning], actions[learning], gain[learning] / 50, next_states[learning], dones[learning])
+            resetting = terminated | truncated
+
+    def save(self, path):
+        """
+        writes the Q-table to a .npy file
+        """
+        np.save(path, self.q)
+
+    def load(self, path, mmap_mode = None):
+        """
+        loads a Q-table written by save
+
+        Parameters
+        ----------
+        path : str
+            the .npy file
+        mmap_mode : str, optional
+            "r" to memory-map the table read-only, which loads in milliseconds whatever its size,
+            and freezes the agent. "r+" to keep training it in place, "c" to train a copy-on-write
+            map of it, None to read it into memory
+        """
+        q = np.load(path, mmap_mode=mmap_mode)
+        assert q.shape == self.q.shape, f"{path} holds a table of shape {q.shape}, expected {self.q.shape}"
+        self.q = q
+        self.frozen = not q.flags.writeable
 
 
 
 class RandomPlayer(Player):
-    def __init__(self):
-        pass
+    def __init__(self, verbose = False):
+        super().__init__(verbose)
 
     def play(self, observation):
         self.log("Getting random action...")
         lock, bank = choose_random_action(observation, self.controller)
         if bank:
-            self.log(f"Random player decided to bank, and lock {lock}")
+            self.log("Random player decided to bank, and lock %s", lock)
         else:
-            self.log(f"Random player decided to lock {lock}")
+            self.log("Random player decided to lock %s", lock)
         return lock, bank
 
     def update(self, observation, reward):
@@ -264,10 +493,323 @@ class RandomPlayer(Player):
         pass
 
 
-class ManualPlayer(Player):
-    def __init__(self):
+def _check_table_max_points(player, controller):
+    """
+    raises a ValueError unless the game of controller is played to the max_points the tables of player were solved for.
+    the tables are indexed by score, so other games would index past them or silently follow the wrong policy
+    """
+    if controller.env.max_points != player.max_points:
+        raise ValueError(f"{type(player).__name__} tables were solved for max_points={player.max_points}, but the game is played to {controller.env.max_points}")
+
+
+class OptimalPlayer(Player):
+    """
+    Plays the expected-value-optimal turn policy computed by solver.py, with one table lookup per decision.
+    """
+    def __init__(self, path = "turn_policy", verbose = False):
+        """
+        Parameters
+        ----------
+        path : str
+            directory of the tables written by solver.save, they are memory-mapped rather than read
+        verbose : bool
+            whether log() writes anything
+        """
+        super().__init__(verbose)
+        self._values, self._policy, self.max_points = solver.load(path)
+
+    def set_controller(self, controller):
+        _check_table_max_points(self, controller)
+        super().set_controller(controller)
+
+    def play(self, observation):
+        turn = observation["turn"]
+        score = observation["player_points"][turn] // solver.POINT_UNIT
+        points_this_turn = observation["points_this_turn"] // solver.POINT_UNIT
+        action = int(self._policy[score, points_this_turn, get_unlocked_multiset_rank(observation)])
+        if action < 0:
+            # only reached if asked to play a roll that farkled, or a game that is already won
+            return np.zeros(len(observation["dice_values"]), dtype=int), False
+
+        lock = convert_multiset_to_lock(FarkleEnv._multisets[action >> 1], observation)
+        bank = bool(action & 1)
+        self.log("Optimal player decided to lock %s, bank: %s", lock, bank)
+        return lock, bank
+
+    def update(self, observation, reward):
+        # no need to update, this player follows a fixed table
+        pass
+
+
+class EndgamePlayer(Player):
+    """
+    Plays two-player games to maximize its chance of winning, with the tables computed by
+    endgame_solver.py, so it takes the score of its opponent into account where OptimalPlayer does not.
+    Tables solved at a granularity coarser than 50 points round the points of every lock, and play worse.
+    """
+    def __init__(self, path = "endgame", verbose = False):
+        """
+        Parameters
+        ----------
+        path : str
+            directory of the tables written by endgame_solver.solve, they are memory-mapped rather than read
+        verbose : bool
+            whether log() writes anything
+        """
+        super().__init__(verbose)
+        self._win, self._start, self.max_points, self.granularity = endgame_solver.load(path)
+        self._size = endgame_solver.grid_size(self.max_points, self.granularity)
+
+    def set_controller(self, controller):
+        _check_table_max_points(self, controller)
+        super().set_controller(controller)
+
+    def _units(self, points):
+        # scores of the tables are rounded to the nearest unit, and past the last unit only once the game is won
+        return min(int(round(points / self.granularity)), self._size - 1)
+
+    def _carry_on_value(self, score, opponent, points_this_turn, dice):
+        if score + points_this_turn >= self.max_points:
+            return 1.0
+        return self._win[self._units(score), self._units(opponent), self._units(points_this_turn), dice] / endgame_solver.WIN_SCALE
+
+    def _bank_value(self, score, opponent, points_this_turn):
+        if score + points_this_turn >= self.max_points:
+            return 1.0
+        # banking hands the opponent the start of a turn
+        return 1 - self._start[self._units(opponent), self._units(score + points_this_turn)]
+
+    def play(self, observation):
+        assert len(observation["player_points"]) == 2, "EndgamePlayer only plays two-player games"
+        turn = observation["turn"]
+        score = int(observation["player_points"][turn])
+        opponent = int(observation["player_points"][1 - turn])
+        points_this_turn = int(observation["points_this_turn"])
+        dice_values = observation["dice_values"]
+        locked_mask = sum(1 << i for i, locked in enumerate(observation["dice_locked"]) if locked)
+        unlocked = len(dice_values) - bin(locked_mask).count("1")
+
+        masks, points = FarkleEnv._get_legal_locks(tuple(int(x) for x in dice_values), locked_mask)
+        best = (-1.0, 0, False)
+        for mask, mask_points in zip(masks, points):
+            # locking every unlocked die is hot dice, and all of them are rolled again
+            dice = unlocked - bin(mask).count("1") or len(dice_values)
+            total = points_this_turn + mask_points
+            best = max(best, (self._carry_on_value(score, opponent, total, dice), mask, False))
+            if score + total >= solver.BANK_THRESHOLD:
+                best = max(best, (self._bank_value(score, opponent, total), mask, True))
+
+        _, mask, bank = best
+        lock = FarkleEnv.mask_to_lock(mask, len(dice_values))
+        self.log("Endgame player decided to lock %s, bank: %s", lock, bank)
+        return lock, bank
+
+    def update(self, observation, reward):
+        # no need to update, this player follows a fixed table
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _search_tables():
+    """
+    Tables shared by every MCTSPlayer, built from solver._roll_tables.
+
+    Returns
+    -------
+    locks : dict[int, tuple]
+        for the rank of every roll that does not farkle, (lock rank, points in units of
+        solver.POINT_UNIT, dice rolled next) of each of its legal locks
+    rolls : list
+        for each number of dice, (ranks of the rolls, cumulative probability of the rolls),
+        to sample a roll with bisect
+    """
+    locks = {}
+    rolls = [None]
+    for dice in range(1, 7):
+        table = solver._roll_tables(dice)
+        for rank, row, points, dice_after in zip(table["rolls"], table["locks"], table["points"], table["dice_after"]):
+            legal = row >= 0
+            if legal.any():
+                locks[int(rank)] = tuple(zip(row[legal].tolist(), points[legal].tolist(), dice_after[legal].tolist()))
+        rolls.append((table["rolls"].tolist(), np.cumsum(table["probability"]).tolist()))
+    return locks, rolls
+
+class MCTSPlayer(Player):
+    """
+    Plays each turn by Monte Carlo tree search over the rest of the turn, maximizing the
+    expected points the turn banks, like OptimalPlayer but without precomputed tables.
+
+    Decision nodes are the roll in front of the player, keyed by the canonical state
+    (rank of the multiset of unlocked dice values, points set aside this turn, score), so
+    rolls that only differ by the order of the dice share a node. Actions are the legal locks
+    of the roll, each followed by banking or rolling again. Rolling again is a chance node:
+    a roll is sampled and the search carries on from its decision node, and farkles are worth
+    nothing. Banking and winning end the turn with a known value.
+
+    Nodes live in a transposition table bounded to table_size nodes, evicting the least
+    recently used. It is kept across calls to play, so the next decision of a turn starts
+    from the subtree already searched below the roll that came up.
+
+    Each decision runs at most `simulations` simulations, and stops early once `time_limit`
+    seconds have passed.
+    """
+    def __init__(self, simulations = 2000, time_limit = None, table_size = 1 << 16, exploration = 1.0, max_points = 10000, verbose = False):
+        """
+        Parameters
+        ----------
+        simulations : int
+            most simulations run per decision
+        time_limit : float, optional
+            most seconds spent per decision, no limit if None
+        table_size : int
+            most nodes kept in the transposition table
+        exploration : float
+            UCB exploration constant, relative to the best mean value of a node's actions
+        max_points : int
+            number of points to win the game, turns end when reaching it
+        verbose : bool
+            whether log() writes anything
+        """
+        super().__init__(verbose)
+        self.simulations = simulations
+        self.time_limit = time_limit
+        self.table_size = table_size
+        self.exploration = exploration
+        self._max_units = -(-max_points // solver.POINT_UNIT)
+        self._threshold = solver.BANK_THRESHOLD // solver.POINT_UNIT
+        self._locks, self._rolls = _search_tables()
+        # key -> [visits, actions, visits of each action, total value of each action]
+        self._table = OrderedDict()
+
+    def _node(self, key):
+        """
+        returns the node of a decision, and whether it was just created. actions are (lock rank, bank,
+        points set aside after the action, dice rolled next), with a known value for the ones ending the turn
+        """
+        node = self._table.get(key)
+        if node is not None:
+            self._table.move_to_end(key)
+            return node, False
+
+        rank, points_this_turn, score = key
+        actions = []
+        for lock, points, dice in self._locks[rank]:
+            total = points_this_turn + points
+            # reaching max_points wins on the spot, whether banking or not
+            if score + total >= self._max_units:
+                actions.append((lock, False, total, 0))
+                continue
+            actions.append((lock, False, total, dice))
+            if score + total >= self._threshold:
+                actions.append((lock, True, total, 0))
+        node = [0, actions, [0] * len(actions), [0.0] * len(actions)]
+        self._table[key] = node
+        if len(self._table) > self.table_size:
+            self._table.popitem(last=False)
+        return node, True
+
+    def _sample_roll(self, dice):
+        ranks, cumulative = self._rolls[dice]
+        return ranks[min(bisect.bisect(cumulative, random.random()), len(ranks) - 1)]
+
+    def _rollout(self, rank, points_this_turn, score):
+        """
+        estimates the value of a roll outside the tree, by locking the most points every time
+        and banking once it is legal and three dice or fewer would be rolled next
+        """
+        while rank in self._locks:
+            lock, points, dice = max(self._locks[rank], key=lambda lock: lock[1])
+            points_this_turn += points
+            if score + points_this_turn >= self._max_units:
+                return points_this_turn
+            if score + points_this_turn >= self._threshold and dice <= 3:
+                return points_this_turn
+            rank = self._sample_roll(dice)
+        return 0
+
+    def _select(self, node):
+        visits, actions, action_visits, action_values = node
+        best, best_score = 0, -math.inf
+        scale = max(1.0, max(value / count for value, count in zip(action_values, action_visits) if count))
+        log_visits = math.log(visits)
+        for i, count in enumerate(action_visits):
+            if not count:
+                return i
+            score = action_values[i] / count + self.exploration * scale * math.sqrt(log_visits / count)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def _simulate(self, key):
+        """
+        runs one simulation from a decision node, returning the points the turn banked
+        """
+        node, created = self._node(key)
+        if created:
+            return self._rollout(*key)
+
+        action = self._select(node) if node[0] else 0
+        lock, bank, total, dice = node[1][action]
+        if bank or not dice:
+            value = total
+        else:
+            rank = self._sample_roll(dice)
+            value = self._simulate((rank, total, key[2])) if rank in self._locks else 0
+        node[0] += 1
+        node[2][action] += 1
+        node[3][action] += value
+        return value
+
+    def search(self, rank, points_this_turn, score):
+        """
+        searches from a roll, returning its node, see _node
+
+        Parameters
+        ----------
+        rank : int
+            rank in FarkleEnv._multisets of the values of the unlocked dice
+        points_this_turn : int
+            points set aside this turn, in units of solver.POINT_UNIT
+        score : int
+            score of the player, in units of solver.POINT_UNIT
+        """
+        key = (rank, points_this_turn, score)
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        for simulation in range(self.simulations):
+            self._simulate(key)
+            # checking the clock costs about as much as a short simulation, so it is only done every few
+            if deadline is not None and simulation % 16 == 15 and time.perf_counter() >= deadline:
+                break
+        node, _ = self._node(key)
+        return node
+
+    def play(self, observation):
+        turn = observation["turn"]
+        rank = get_unlocked_multiset_rank(observation)
+        if rank not in self._locks:
+            # only reached if asked to play a roll that farkled
+            return np.zeros(len(observation["dice_values"]), dtype=int), False
+
+        score = int(observation["player_points"][turn]) // solver.POINT_UNIT
+        points_this_turn = int(observation["points_this_turn"]) // solver.POINT_UNIT
+        visits, actions, action_visits, action_values = self.search(rank, points_this_turn, score)
+        best = max(range(len(actions)), key=lambda i: (action_visits[i], action_values[i]))
+        lock, bank, _, _ = actions[best]
+
+        lock = convert_multiset_to_lock(FarkleEnv._multisets[lock], observation)
+        self.log("MCTS player searched %s simulations, decided to lock %s, bank: %s", visits, lock, bank)
+        return lock, bool(bank)
+
+    def update(self, observation, reward):
+        # the transposition table is keyed by score, so it needs no update between turns
         pass
 
+
+class ManualPlayer(Player):
+    # a human player needs to see why their input was rejected, so it is verbose by default
+    def __init__(self, verbose = True):
+        super().__init__(verbose)
+
     def _get_bank_input(self):
         while True:
             bank = input("bank? (y/N)")
@@ -0,0 +1,147 @@
+from testing import FarkleEnv
+
+# the original rules of FarkleEnv, which searched the sorted string of dice values for the keys of
+# FarkleEnv.combinations and recursed on the dice left over. FarkleEnv now looks scores up in tables
+# built from the same combinations; these functions are kept as the reference verify.py checks
+# the tables, and any faster rules, against. they are slow, and not meant to be used in games
+
+
+def _helper_flip_lock(string, dice_values, dice_locked):
+    """
+    returns a new array of which dice are locked after the player has attempted to lock a combination of dice
+
+    Parameters
+    ----------
+    string: string
+        a string indicating the values of the dice the player is trying to lock
+    dice_values: array-like
+        an array of integers indicating the value of each die in each position
+    dice_locked: array-like
+        0 if the die is unlocked, 1 otherwise
+
+    Returns
+    -------
+    new_locked: array-like
+        0 if the die was previously locked, but we are unlocking it by redeeming some combination of points, 1 otherwise
+    """
+    new_locked = [x for x in dice_locked]
+    for char in string:
+        x = int(char)
+        for i, value in enumerate(dice_values): # we find a dice of matching value and undo the lock
+            if value == x and new_locked[i]:
+                new_locked[i] = 0
+                break
+    return new_locked
+
+def calculate_points(dice_values, lock_action):
+    """
+    checks how many points a player obtained with the dice they locked
+
+    Parameters
+    ---------
+    dice_values: array-like
+        the value of each die
+    lock_action: array-like
+        indicates which dice the player locked this turn
+        0 in indices where the corresponding dice is unlocked, 1 otherwise
+
+    Returns
+    -------
+    max_points: integer
+        the amount of points scored by the player's lock actions
+    """
+    locked = []
+    num_locked = 0
+    for lock, die in zip(lock_action, dice_values):
+        if lock:
+            locked.append(die)
+            num_locked += 1
+
+    locked.sort()
+    locked = [str(x) for x in locked]
+    string = "".join(locked)
+    max_points = 0
+    for i in range(num_locked, 0, -1):
+        for dict in FarkleEnv.combinations[i]:
+            for key in dict.keys():
+                if key in string:
+                    current_points = dict[key]
+                    current_points += calculate_points(dice_values, _helper_flip_lock(key, dice_values, lock_action))
+                    max_points = max(current_points, max_points)
+
+    return max_points
+
+def verify_combo(dice_values, lock_action):
+    """
+    verifies that the combination of dice a player has locked is valid.
+    i.e., all dice locked correspond to one or multiple combinations
+
+    Parameters
+    ---------
+    dice_values: array-like
+        the value of each die
+    lock_action: array-like
+        indicates which dice the player locked this turn
+        0 in indices where the corresponding dice is unlocked, 1 otherwise
+
+    Returns
+    -------
+    valid: bool
+        True if the dice locked correspond to some valid combination, False otherwise
+    """
+    locked = []
+    num_locked = 0
+    for lock, die in zip(lock_action, dice_values):
+        if lock:
+            locked.append(die)
+            num_locked += 1
+
+    locked.sort()
+    locked = [str(x) for x in locked]
+    string = "".join(locked)
+    for i in range(num_locked, 0, -1):
+        for dict in FarkleEnv.combinations[i]:
+            for key in dict.keys():
+                if key in string:
+                    new_lock_action = _helper_flip_lock(key, dice_values, lock_action)
+                    if all(x == 0 for x in new_lock_action):
+                        return True
+                    if verify_combo(dice_values, new_lock_action): # if the currently found combination does not account for all the locked die, maybe this combination and some other with the remaining dice will
+                        return True
+
+    return False
+
+def check_farkle(dice_values, dice_locked):
+    """
+    checks if a player has farkled, from the dice alone. FarkleEnv.check_farkle also
+    never reports a farkle after banking or once the game is over
+
+    Parameters
+    ---------
+    dice_values: array-like
+        the value of each die
+    dice_locked: array-like
+        indicates if a die is locked or not
+        0 in indices where the corresponding dice is unlocked, 1 otherwise
+
+    Returns
+    -------
+    bool
+        True is the player farkled
+    """
+    unlocked = []
+    num_unlocked = 0
+    for lock, die in zip(dice_locked, dice_values):
+        if not lock:
+            unlocked.append(die)
+            num_unlocked += 1
+
+    unlocked.sort()
+    unlocked = [str(x) for x in unlocked]
+    string = "".join(unlocked)
+    for i in range(1, num_unlocked+1):
+        for dict in FarkleEnv.combinations[i]:
+            for key in dict.keys():
+                if key in string:
+                    return False # the player did not farkle, there is at least one redeemable combination
+    return True
@@ -0,0 +1,332 @@
+import json
+import numpy as np
+from wrappers import DiscreteActionWrapper
+
+# bit layout of the packed dice field of a record: 3 bits of value - 1 per die, then 1 lock bit per die,
+# then the discrete action index (see DiscreteActionWrapper) and a done bit
+_VALUE_BITS = 3
+_LOCK_SHIFT = 18
+_ACTION_SHIFT = 24
+_DONE_SHIFT = 31
+# scores are stored in units of 50 points, every score in the rules is a multiple of it
+POINT_UNIT = 50
+
+
+def transition_dtype(players):
+    """
+    returns the structured dtype of one packed transition of a game with a number of players,
+    4 * players + 15 bytes long
+    """
+    return np.dtype([
+        ("dice", np.uint32),
+        ("next_dice", np.uint32),
+        ("player_points", np.uint16, (players,)),
+        ("next_player_points", np.uint16, (players,)),
+        ("points_this_turn", np.uint16),
+        ("next_points_this_turn", np.uint16),
+        ("turn", np.uint8),
+        ("next_turn", np.uint8),
+        ("reward", np.int8),
+    ])
+
+def pack_dice(dice_values, dice_locked):
+    """
+    Packs dice values and locks into the low 24 bits of an integer.
+
+    Parameters
+    ----------
+    dice_values : array-like
+        (..., 6) values of the dice
+    dice_locked : array-like
+        (..., 6) 1 where the die is locked, 0 otherwise
+
+    Returns
+    -------
+    np.ndarray
+        (...) uint32 packed dice
+    """
+    dice_values = np.asarray(dice_values, dtype=np.uint32)
+    dice_locked = np.asarray(dice_locked, dtype=np.uint32)
+    shifts = np.arange(dice_values.shape[-1], dtype=np.uint32)
+    values = ((dice_values - 1) << (shifts * _VALUE_BITS)).sum(axis=-1, dtype=np.uint32)
+    locks = (dice_locked << shifts).sum(axis=-1, dtype=np.uint32)
+    return values | (locks << _LOCK_SHIFT)
+
+def unpack_dice(packed, dice = 6):
+    """
+    unpacks the dice values and locks packed by pack_dice, as two (..., dice) uint8 arrays
+    """
+    packed = np.asarray(packed, dtype=np.uint32)[..., None]
+    shifts = np.arange(dice, dtype=np.uint32)
+    dice_values = ((packed >> (shifts * _VALUE_BITS)) & 7).astype(np.uint8) + 1
+    dice_locked = ((packed >> (shifts + _LOCK_SHIFT)) & 1).astype(np.uint8)
+    return dice_values, dice_locked
+
+
+class ReplayBuffer:
+    """
+    Stores transitions of FarkleEnv games packed into fixed-width records, in a circular buffer.
+
+    A record holds the dice and locks of the observation and the next observation (3 bits per
+    die value, 1 per lock), the discrete action index of DiscreteActionWrapper (7 bits), the
+    done flag, the scores in units of 50 points, the player to move in both observations and
+    the reward. It takes 4 * players + 15 bytes, 23 for a two-player game, so a GB holds about
+    43 million transitions.
+
+    Transitions are packed when added, so observations holding the environment's live arrays
+    can be passed as they are. The records live in a preallocated array, or in a memory-mapped
+    .npy file when a path is given, for buffers larger than RAM. The position and size of a
+    memory-mapped buffer are kept next to it in path + ".json" by flush, so it can be reopened
+    with mode="r+" and filled further.
+
+    Sampling is uniform, or prioritized (Schaul et al., 2016) with a sum tree: transitions are
+    drawn with probability proportional to priority ** alpha, and come with importance sampling
+    weights (N * P(i)) ** -beta, normalized by their maximum.
+    """
+
+    def __init__(self, capacity, players = 1, path = None, prioritized = False, alpha = 0.6, beta = 0.4, epsilon = 1e-6, mode = "w+"):
+        """
+        Parameters
+        ----------
+        capacity : int
+            most transitions stored, the oldest are overwritten first
+        players : int
+            number of players of the games stored
+        path : str, optional
+            .npy file to memory-map the records to, in memory if None
+        prioritized : bool
+            whether sampling is prioritized rather than uniform
+        alpha : float
+            how much priorities count, 0 is uniform
+        beta : float
+            how much importance sampling weights correct for prioritization, 1 fully
+        epsilon : float
+            added to priorities, so every transition can still be sampled
+        mode : str
+            with a path, "w+" to create the file, replacing any file there, or "r+" to reopen a
+            buffer of the same capacity and players, flushed to it before. the priorities of a
+            reopened prioritized buffer are not kept, every stored transition starts at 1
+        """
+        assert mode in ("w+", "r+")
+        self.capacity = capacity
+        self.players = players
+        self.dtype = transition_dtype(players)
+        self.path = path
+        # index the next transition is written to, and number of transitions stored
+        self._position = 0
+        self._size = 0
+        if path is None:
+            self._records = np.zeros(capacity, dtype=self.dtype)
+        elif mode == "w+":
+            self._records = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(capacity,))
+            # replaces the state of any buffer the file held before
+            self.flush()
+        else:
+            self._records = np.lib.format.open_memmap(path, mode="r+")
+            if self._records.dtype != self.dtype or self._records.shape != (capacity,):
+                raise ValueError(f"{path} holds {self._records.shape[0]} records of {self._records.dtype}, expected {capacity} of {self.dtype}")
+            with open(ReplayBuffer.state_path(path)) as f:
+                state = json.load(f)
+            self._position = state["position"]
+            self._size = state["size"]
+
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        if prioritized:
+            # sum tree over the leaves [leaves, 2 * leaves), node i is the sum of nodes 2i and 2i + 1
+            self._leaves = 1 << max(0, (capacity - 1).bit_length())
+            self._tree = np.zeros(2 * self._leaves)
+            self._max_priority = 1.0
+            if self._size:
+                self._set_priorities(np.arange(self._size), np.ones(self._size))
+
+    @staticmethod
+    def state_path(path):
+        """
+        returns the file the position and size of a buffer memory-mapped to path are kept in
+        """
+        return f"{path}.json"
+
+    def __len__(self):
+        return self._size
+
+    def add(self, observation, action, reward, next_observation, done):
+        """
+        Adds one transition.
+
+        Parameters
+        ----------
+        observation : dict
+            observation the action was taken in
+        action : int or dict
+            discrete action index, or action dict of FarkleEnv.step
+        reward : int
+            reward of the step
+        next_observation : dict
+            observation after the step
+        done : bool
+            whether the game ended
+        """
+        if isinstance(action, dict):
+            action = DiscreteActionWrapper.encode_action(action["lock"], action["bank"])
+        self.add_batch(
+            {key: np.asarray(value)[None] for key, value in observation.items()},
+            np.array([action]),
+            np.array([reward]),
+            {key: np.asarray(value)[None] for key, value in next_observation.items()},
+            np.array([done]),
+        )
+
+    def add_batch(self, observations, actions, rewards, next_observations, dones):
+        """
+        Adds a batch of transitions, e.g. one step of a VectorFarkleEnv.
+
+        Parameters
+        ----------
+        observations : dict
+            observations with a leading batch dimension
+        actions : np.ndarray
+            (B,) discrete action indices
+        rewards : np.ndarray
+            (B,) rewards
+        next_observations : dict
+            observations after the steps, with a leading batch dimension
+        dones : np.ndarray
+            (B,) whether each game ended
+        """
+        actions = np.asarray(actions, dtype=np.uint32)
+        count = len(actions)
+        assert count <= self.capacity
+        indices = (self._position + np.arange(count)) % self.capacity
+
+        records = np.empty(count, dtype=self.dtype)
+        records["dice"] = (
+            pack_dice(observations["dice_values"], observations["dice_locked"])
+            | (actions << _ACTION_SHIFT)
+            | (np.asarray(dones, dtype=np.uint32) << _DONE_SHIFT)
+        )
+        records["next_dice"] = pack_dice(next_observations["dice_values"], next_observations["dice_locked"])
+        records["player_points"] = np.asarray(observations["player_points"]).reshape(count, self.players) // POINT_UNIT
+        records["next_player_points"] = np.asarray(next_observations["player_points"]).reshape(count, self.players) // POINT_UNIT
+        records["points_this_turn"] = np.asarray(observations["points_this_turn"]).reshape(count) // POINT_UNIT
+        records["next_points_this_turn"] = np.asarray(next_observations["points_this_turn"]).reshape(count) // POINT_UNIT
+        records["turn"] = np.asarray(observations["turn"]).reshape(count)
+        records["next_turn"] = np.asarray(next_observations["turn"]).reshape(count)
+        records["reward"] = rewards
+        self._records[indices] = records
+
+        if self.prioritized:
+            self._set_priorities(indices, np.full(count, self._max_priority ** self.alpha))
+        self._position = (self._position + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    def _set_priorities(self, indices, values):
+        """
+        sets leaves of the sum tree, then recomputes their ancestors one level at a time
+        """
+        nodes = indices + self._leaves
+        self._tree[nodes] = values
+        nodes = np.unique(nodes >> 1)
+        while nodes[0] >= 1:
+            self._tree[nodes] = self._tree[2 * nodes] + self._tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes >> 1)
+
+    def update_priorities(self, indices, priorities):
+        """
+        sets the priorities of sampled transitions, typically their absolute TD errors
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            indices returned by sample
+        priorities : np.ndarray
+            new priority of each transition
+        """
+        assert self.prioritized
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64)) + self.epsilon
+        self._max_priority = max(self._max_priority, float(priorities.max()))
+        self._set_priorities(np.asarray(indices), priorities ** self.alpha)
+
+    def sample(self, batch_size, rng = None):
+        """
+        Samples a batch of transitions, with replacement.
+
+        Parameters
+        ----------
+        batch_size : int
+            number of transitions
+        rng : np.random.Generator, optional
+            generator to sample with, a fresh one if None
+
+        Returns
+        -------
+        indices : np.ndarray
+            (B,) indices of the transitions, for update_priorities
+        batch : dict
+            the unpacked transitions, see unpack
+        weights : np.ndarray
+            (B,) importance sampling weights, all 1 when sampling uniformly
+        """
+        assert self._size > 0
+        rng = np.random.default_rng() if rng is None else rng
+        if not self.prioritized:
+            indices = rng.integers(0, self._size, size=batch_size)
+            return indices, self.unpack(self._records[indices]), np.ones(batch_size)
+
+        # one uniform draw per equal segment of the total priority, then a walk down the tree
+        total = self._tree[1]
+        targets = (np.arange(batch_size) + rng.random(batch_size)) * (total / batch_size)
+        nodes = np.ones(batch_size, dtype=np.int64)
+        while nodes[0] < self._leaves:
+            left = 2 * nodes
+            go_right = targets >= self._tree[left]
+            targets = np.where(go_right, targets - self._tree[left], targets)
+            nodes = left + go_right
+        # rounding can land past the stored transitions, on leaves of priority 0
+        indices = np.minimum(nodes - self._leaves, self._size - 1)
+
+        probabilities = self._tree[indices + self._leaves] / total
+        weights = (self._size * probabilities) ** -self.beta
+        return indices, self.unpack(self._records[indices]), weights / weights.max()
+
+    def unpack(self, records):
+        """
+        Unpacks records into arrays.
+
+        Returns
+        -------
+        dict
+            "dice_values", "dice_locked", "player_points", "points_this_turn", "turn", "action",
+            "reward", "done" and the "next_" observation keys, including "next_turn", with a leading batch dimension.
+            points are back in points rather than units
+        """
+        dice_values, dice_locked = unpack_dice(records["dice"])
+        next_dice_values, next_dice_locked = unpack_dice(records["next_dice"])
+        return {
+            "dice_values": dice_values,
+            "dice_locked": dice_locked,
+            "player_points": records["player_points"].astype(np.int64) * POINT_UNIT,
+            "points_this_turn": records["points_this_turn"].astype(np.int64) * POINT_UNIT,
+            "turn": records["turn"].astype(np.int64),
+            "action": ((records["dice"] >> _ACTION_SHIFT) & 0x7F).astype(np.int64),
+            "reward": records["reward"].astype(np.int64),
+            "done": ((records["dice"] >> _DONE_SHIFT) & 1).astype(bool),
+            "next_dice_values": next_dice_values,
+            "next_dice_locked": next_dice_locked,
+            "next_player_points": records["next_player_points"].astype(np.int64) * POINT_UNIT,
+            "next_points_this_turn": records["next_points_this_turn"].astype(np.int64) * POINT_UNIT,
+            "next_turn": records["next_turn"].astype(np.int64),
+        }
+
+    def flush(self):
+        """
+        writes the records of a memory-mapped buffer to its file, and its position and size to state_path(path)
+        """
+        if isinstance(self._records, np.memmap):
+            self._records.flush()
+            with open(ReplayBuffer.state_path(self.path), "w") as f:
+                json.dump({"position": self._position, "size": self._size}, f)
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+from math import factorial
+import numpy as np
+from testing import FarkleEnv
+
+# all scores in the rules are multiples of 50, so the solver counts points in units of 50
+POINT_UNIT = 50
+# points a player needs to be allowed to bank, see FarkleEnv.check_bank_legal
+BANK_THRESHOLD = 500
+
+
+def _roll_tables(dice):
+    """
+    Lists every roll of a number of dice, and every legal lock of each roll.
+
+    Parameters
+    ----------
+    dice : int
+        number of dice rolled, 1 to 6
+
+    Returns
+    -------
+    dict
+        - "rolls": rank in FarkleEnv._multisets of each roll
+        - "probability": probability of each roll
+        - "locks": rank of each legal lock of each roll, -1 padded, shape (rolls, most locks of any roll)
+        - "points": points of each lock, in units of POINT_UNIT
+        - "dice_after": number of dice rolled next after each lock, 6 after hot dice
+        - "best_points": points of the best lock of each roll, 0 if the roll farkles
+    """
+    multisets = np.array(FarkleEnv._multisets)
+    sizes = multisets.sum(axis=1)
+    rolls = np.flatnonzero(sizes == dice)
+    counts = multisets[rolls]
+    probability = factorial(dice) / np.prod([[factorial(c) for c in row] for row in counts], axis=1) / 6**dice
+
+    # a lock is legal if it is a sub-multiset of the roll made up entirely of scoring combinations
+    valid = FarkleEnv._combo_table[FarkleEnv._multiset_index]
+    legal = (multisets[None, :, :] <= counts[:, None, :]).all(axis=2) & valid[None, :]
+    width = max(1, int(legal.sum(axis=1).max()))
+    locks = np.full((len(rolls), width), -1, dtype=np.int64)
+    for i, row in enumerate(legal):
+        ranks = np.flatnonzero(row)
+        locks[i, :len(ranks)] = ranks
+
+    padded = locks < 0
+    points = np.where(padded, 0, FarkleEnv._score_table[FarkleEnv._multiset_index[locks]] // POINT_UNIT)
+    dice_after = dice - np.where(padded, 0, sizes[locks])
+    dice_after[dice_after == 0] = 6
+    return {
+        "rolls": rolls,
+        "probability": probability,
+        "locks": locks,
+        "points": points,
+        "dice_after": dice_after,
+        "best_points": points.max(axis=1),
+    }
+
+def solve(max_points = 10000):
+    """
+    Computes the expected-value-optimal play of a single Farkle turn, for every turn state.
+
+    A turn state is the player's banked score s, the points t they have set aside this turn,
+    and the roll in front of them. Before each roll, the value of a state is the expected
+    number of points the turn will add to the player's score: t plus the points of their lock
+    if they bank, t plus the value of the next roll if they carry on, 0 if they farkle.
+    A player whose score reaches max_points wins, so their turn ends there.
+    Locking nothing and rolling again is not considered.
+
+    Locking always adds points, so values only depend on states with larger t. They are
+    computed exactly in a single pass of decreasing t, vectorized over s.
+
+    Parameters
+    ----------
+    max_points : int
+        number of points to win the game, a multiple of POINT_UNIT
+
+    Returns
+    -------
+    values : np.ndarray
+        float32 array of shape (S, S, 7), S = max_points // POINT_UNIT. entry [s, t, n] is the
+        expected points added by a turn with score s * POINT_UNIT, t * POINT_UNIT points set aside,
+        before rolling n dice. entries where s + t >= S are won turns, valued t
+    policy : np.ndarray
+        int16 array of shape (S, S, len(FarkleEnv._multisets)). entry [s, t, r] is the best action
+        for the roll of rank r, encoded as 2 * (rank of the multiset to lock) + (1 if banking).
+        -1 where the roll farkles, or s + t >= S
+    """
+    size = max_points // POINT_UNIT
+    threshold = BANK_THRESHOLD // POINT_UNIT
+    tables = [None] + [_roll_tables(dice) for dice in range(1, 7)]
+    most_points = max(int(table["points"].max()) for table in tables[1:])
+
+    # values[s, t, n], with t extended past size so that every lock lands inside the array
+    score = np.arange(size)
+    values = np.broadcast_to(np.arange(size + most_points + 1)[None, :, None], (size, size + most_points + 1, 7)).astype(np.float64)
+    policy = np.full((size, size, len(FarkleEnv._multisets)), -1, dtype=np.int16)
+
+    for t in range(size - 1, -1, -1):
+        playing = score + t < size
+        for dice in range(1, 7):
+            table = tables[dice]
+            locks = table["locks"]
+            carry_on = values[:, t + table["points"], table["dice_after"]]
+            carry_on[:, locks < 0] = -np.inf
+            best_lock = carry_on.argmax(axis=2)
+            carry_on = carry_on.max(axis=2)
+
+            best_points = table["best_points"][None, :]
+            bank = np.where(score[:, None] + t + best_points >= threshold, t + best_points, -np.inf)
+            scoring = locks[:, 0] >= 0
+            outcome = np.where(scoring[None, :], np.maximum(bank, carry_on), 0)
+            values[playing, t, dice] = (outcome @ table["probability"])[playing]
+
+            banking = bank >= carry_on
+            bank_lock = locks[np.arange(len(locks)), table["points"].argmax(axis=1)]
+            lock = np.where(banking, bank_lock[None, :], locks[np.arange(len(locks))[None, :], best_lock])
+            action = np.where(scoring[None, :], 2 * lock + banking, -1)
+            policy[np.ix_(np.flatnonzero(playing), [t], table["rolls"])] = action[playing][:, None, :]
+
+    return values[:, :size, :].astype(np.float32), policy
+
+def save(path, values, policy, max_points):
+    """
+    Writes solved tables to the directory path, as .npy files that load() memory-maps.
+    """
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "values.npy"), values)
+    np.save(os.path.join(path, "policy.npy"), policy)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"max_points": max_points, "point_unit": POINT_UNIT}, f)
+
+def load(path):
+    """
+    Memory-maps the tables written by save().
+
+    Returns
+    -------
+    values : np.ndarray
+        read-only memory-mapped values, see solve
+    policy : np.ndarray
+        read-only memory-mapped policy, see solve
+    max_points : int
+        number of points to win the game the tables were solved for
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+    policy = np.load(os.path.join(path, "policy.npy"), mmap_mode="r")
+    return values, policy, meta["max_points"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="solve the expected-value-optimal Farkle turn policy")
+    parser.add_argument("--max-points", type=int, default=10000)
+    parser.add_argument("--output", default="turn_policy", help="directory to write the tables to")
+    args = parser.parse_args()
+
+    values, policy = solve(args.max_points)
+    save(args.output, values, policy, args.max_points)
+    print(f"expected points of a first turn: {values[0, 0, 6] * POINT_UNIT:.1f}")
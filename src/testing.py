@@ -1,9 +1,29 @@
+import copy
+import functools
+from typing import NamedTuple
 import numpy as np
 import gymnasium as gym
 import utility
+from dice_stream import DiceStream
 from gymnasium.envs.registration import register
 
 
+class EnvState(NamedTuple):
+    """
+    Snapshot of everything a FarkleEnv needs to continue a game, see FarkleEnv.get_state.
+    The arrays are private copies, and must not be modified.
+    """
+    dice_values: np.ndarray
+    dice_locked: np.ndarray
+    player_points: np.ndarray
+    points_this_turn: int
+    turn: int
+    # position of the environment's DiceStream, see DiceStream.get_state
+    dice_stream: tuple
+    # packed multiset index of the unlocked dice, see FarkleEnv._unlocked_index
+    unlocked_index: int
+
+
 class FarkleEnv(gym.Env):
 
 
@@ -49,12 +69,223 @@ class FarkleEnv(gym.Env):
 
         return all_combinations
     
+    @staticmethod
+    def _get_multisets():
+        """
+        Returns every multiset of at most 6 dice.
+
+        Returns
+        -------
+        list[list[int]]
+            count vectors, where entry v-1 is the number of dice showing value v.
+            multisets are ordered by increasing number of dice, so removing dice from a
+            multiset always gives one that appears earlier in the list
+        """
+        multisets = [[0] * 6]
+        previous = multisets
+        for _ in range(6):
+            grown = []
+            for counts in previous:
+                for value in range(6):
+                    if any(counts[value+1:]):
+                        continue  # only grow in non-decreasing value order, so each multiset is visited once
+                    new_counts = counts.copy()
+                    new_counts[value] += 1
+                    grown.append(new_counts)
+            multisets += grown
+            previous = grown
+
+        return multisets
+
+    @staticmethod
+    def _get_rules(combinations):
+        """
+        Returns the scoring rules as (count vector, packed index, score) triples.
+
+        Parameters
+        ----------
+        combinations: dict[int, list[dict[str, int]]]
+            the scoring rules, as returned by `_get_combinations`
+        """
+        rules = []
+        for rule_dicts in combinations.values():
+            for rule_dict in rule_dicts:
+                for key, value in rule_dict.items():
+                    counts = [key.count(str(x)) for x in range(1, 7)]
+                    rules.append((counts, sum(count * 7**i for i, count in enumerate(counts)), value))
+        return rules
+
+    @staticmethod
+    def _get_score_table(rules, multisets):
+        """
+        Returns the best score of every multiset of at most 6 dice.
+
+        A multiset is packed into an integer as sum(count[v] * 7**(v-1)) over the die
+        values v, see `_die_weight`. The score of a multiset is the best total obtained by
+        redeeming scoring combinations from `rules` one after the other, which is
+        what the recursive search over sorted dice strings used to compute on every call.
+
+        Parameters
+        ----------
+        rules: list[tuple[list[int], int, int]]
+            the scoring rules, as returned by `_get_rules`
+        multisets: list[list[int]]
+            count vectors ordered by number of dice, as returned by `_get_multisets`
+
+        Returns
+        -------
+        np.ndarray
+            array of length 7**6 mapping each packed multiset to its score.
+            entries that do not correspond to at most 6 dice are 0
+        """
+        table = np.zeros(7**6, dtype=np.int32)
+        for counts in multisets:
+            index = sum(count * 7**i for i, count in enumerate(counts))
+            best = 0
+            for rule_counts, rule_index, value in rules:
+                if all(c >= r for c, r in zip(counts, rule_counts)):
+                    best = max(best, value + table[index - rule_index])
+            table[index] = best
+
+        return table
+
+    @staticmethod
+    def _get_combo_table(rules, multisets):
+        """
+        Returns whether every multiset of at most 6 dice is made up entirely of scoring combinations.
+
+        Parameters
+        ----------
+        rules: list[tuple[list[int], int, int]]
+            the scoring rules, as returned by `_get_rules`
+        multisets: list[list[int]]
+            count vectors ordered by number of dice, as returned by `_get_multisets`
+
+        Returns
+        -------
+        np.ndarray
+            boolean array of length 7**6 indexed like `_score_table`.
+            True if the dice can be split into scoring combinations with none left over.
+            the empty multiset is not a valid combination
+        """
+        table = np.zeros(7**6, dtype=bool)
+        for counts in multisets:
+            index = sum(count * 7**i for i, count in enumerate(counts))
+            for rule_counts, rule_index, _ in rules:
+                if all(c >= r for c, r in zip(counts, rule_counts)) and (index == rule_index or table[index - rule_index]):
+                    table[index] = True
+                    break
+
+        return table
+
+    @staticmethod
+    def _get_multiset_ranks(multisets):
+        """
+        Returns the packed index of every multiset and the inverse mapping.
+
+        Parameters
+        ----------
+        multisets: list[list[int]]
+            count vectors, as returned by `_get_multisets`
+
+        Returns
+        -------
+        np.ndarray
+            packed index (see `_get_score_table`) of each multiset, in the order of `multisets`
+        np.ndarray
+            array of length 7**6 mapping a packed index to the position of its multiset in `multisets`,
+            -1 for entries that do not correspond to at most 6 dice
+        """
+        index = np.array([sum(count * 7**i for i, count in enumerate(counts)) for counts in multisets], dtype=np.int64)
+        rank = np.full(7**6, -1, dtype=np.int16)
+        rank[index] = np.arange(len(multisets))
+        return index, rank
+
+    # upper bound of the points in an observation. a game ends on the turn a player reaches max_points,
+    # with no cap on how far that turn overshoots it, so points are only bounded by their dtype
+    points_high = np.iinfo(np.int32).max
+
+    @staticmethod
+    def make_observation_space(players, max_points, dice = 6, seed = None):
+        """
+        Returns the space of a single environment's observations, see _get_obs.
+
+        Every array of an observation is int64 and has the fixed shape of its subspace, with
+        points_this_turn a 0-d array and turn an int, so observations are contained in the space
+        and batch into gymnasium's vector environments as they are, including the shared memory
+        of AsyncVectorEnv.
+
+        Parameters
+        ----------
+        players: int
+            number of players
+        max_points: int
+            number of points to win the game, only used to check the space is valid
+        dice: int
+            number of dice
+        seed: int, optional
+            seed of the space's dice_values sampler
+
+        Returns
+        -------
+        gym.spaces.Dict
+            the space, with the keys of _get_obs
+        """
+        assert 0 < max_points <= FarkleEnv.points_high
+        return gym.spaces.Dict(
+            {
+                # value of each die
+                "dice_values": gym.spaces.MultiDiscrete([6]*dice, seed=seed, start=[1]*dice),
+                # 0 for each unlocked die, 1 otherwise. MultiBinary would be int8
+                "dice_locked": gym.spaces.MultiDiscrete([2]*dice),
+                # points of each player
+                "player_points": gym.spaces.Box(0, FarkleEnv.points_high, shape=(players,), dtype=np.int64),
+                # amount of points the player has scored already in their turn
+                "points_this_turn": gym.spaces.Box(0, FarkleEnv.points_high, shape=(), dtype=np.int64),
+                # index of the player to move
+                "turn": gym.spaces.Discrete(players),
+            }
+        )
+
     combinations = _get_combinations()
 
+    # weight of a single die of each value in a packed multiset index, see _get_score_table
+    _die_weight = (0, 1, 7, 49, 343, 2401, 16807)
+    _multisets = _get_multisets()
+    _rules = _get_rules(combinations)
+    _score_table = _get_score_table(_rules, _multisets)
+    _combo_table = _get_combo_table(_rules, _multisets)
+    _multiset_index, _multiset_rank = _get_multiset_ranks(_multisets)
+    # number of bits of a multiset rank in a packed state id, see encode_state
+    _dice_bits = (len(_multisets) - 1).bit_length()
+
     dice_str = utility.get_dice_strings()
     lock_str = utility.get_lock_strings()
 
-    def __init__(self, players = 1, random_seed = None, max_points = 10000):
+    metadata = {"render_modes": ["human", "ansi"]}
+    logger = utility.get_logger("env", "GAME")
+
+    # how observations relate to the state of the environment, see _get_obs
+    observation_modes = ("live", "copy", "buffered")
+
+    # the phases of a step timed when profiling, see enable_profiling. step checks and scores locks
+    # with table lookups in _check_lock_index and _lock_points, rather than through calculate_points
+    # and verify_combo, so those are not phases. check_lock_legal is, for the players that call it
+    profiled_methods = (
+        "step", "check_legal", "check_lock_legal", "_check_lock_index", "_lock_points", "_update_locks",
+        "_check_hot_dice", "_hot_dice", "_roll_unlocked_dice", "check_farkle", "_check_win",
+        "_get_obs", "_get_info", "action_mask", "acknowledge_bank", "acknowledge_farkle", "_new_round",
+    )
+
+    def __init__(self, players = 1, random_seed = None, max_points = 10000, action_masks = False, render_mode = None, profile = False, auto_advance = False, observation_mode = "live"):
+        # None renders nothing and logs nothing, "human" logs the game and prints the dice to stdout,
+        # "ansi" only returns the dice from render()
+        assert render_mode is None or render_mode in FarkleEnv.metadata["render_modes"]
+        self.render_mode = render_mode
+        # name -> [calls, total nanoseconds] of each profiled method, None when not profiling
+        self._stats = None
+        if profile:
+            self.enable_profiling()
         self.log("initializing FarkleEnv...")
         # number of players in the game
         self.players = players
@@ -62,27 +293,47 @@ class FarkleEnv(gym.Env):
         self.dice = 6
         # number of points to win the game
         self.max_points = max_points
-
-        # observation space of environment
-            # value of each die
-            # bool for each die - True if locked, False otherwise
-            # points of each player
-            # amount of points the player has scored already in their turn
-        self.observation_space = gym.spaces.Dict(
-            {
-                "dice_values": gym.spaces.MultiDiscrete([6]*self.dice, seed=random_seed, start=[1]*self.dice),
-                "dice_locked": gym.spaces.MultiBinary(self.dice),
-                "player_points": gym.spaces.Box(0, max_points, shape=(self.players,), dtype=int),
-                "points_this_turn": gym.spaces.Box(0, max_points, dtype=int)
-            }
-        )
-
-        # private representation of the game
-        self._dice_values = self.observation_space["dice_values"].sample()
-        self._dice_locked = np.array([0 for _ in range(self.dice)], dtype=int) 
-        self._player_points = np.array([0 for _ in range(self.players)], dtype=int)
+        # whether the info dict carries the mask of legal actions, see action_mask()
+        self._action_masks = action_masks
+        # whether step starts the next turn itself when a turn ends, instead of waiting for
+        # acknowledge_bank/acknowledge_farkle, see _advance
+        self.auto_advance = auto_advance
+        # widths of the fields of a packed state id, see encode_state. scores are multiples of 50,
+        # with room for a winning turn to overshoot max_points
+        self._points_bits = (2 * max_points // 50).bit_length()
+        self._turn_bits = (players - 1).bit_length()
+        self.state_bits = FarkleEnv._dice_bits + self._points_bits + self._turn_bits + self._points_bits * players
+
+        # observation space of environment, see make_observation_space
+        self.observation_space = FarkleEnv.make_observation_space(self.players, max_points, self.dice, random_seed)
+
+        # dice are rolled from blocks drawn from the environment's generator, see reset
+        if random_seed is not None:
+            self._np_random, self._np_random_seed = gym.utils.seeding.np_random(random_seed)
+        self._dice_stream = DiceStream(self.np_random)
+
+        # private representation of the game. the arrays are allocated once, and updated in place from then on
+        self._dice_values = self._dice_stream.roll(self.dice).copy()
+        self._dice_locked = np.zeros(self.dice, dtype=np.int64)
+        self._player_points = np.zeros(self.players, dtype=np.int64)
         self._points_this_turn = 0
         self._turn = 0 
+        # count histogram of the values of the unlocked dice, packed as a multiset index (see `_die_weight`).
+        # it is kept up to date as dice are locked and rolled, so the rules never rebuild it from the dice
+        self._unlocked_index = FarkleEnv._packed_index(self._dice_values)
+
+        # "live" observations are the arrays above, "copy" ones are fresh copies of them, and "buffered" ones
+        # are written into preallocated buffers, see _get_obs
+        assert observation_mode in FarkleEnv.observation_modes
+        self.observation_mode = observation_mode
+        # in "buffered" mode, the buffers written in turn, the observations returned for each of them,
+        # the index of the last one written, and the buffer of the final observations of turns, see set_observation_buffers
+        self._observation_buffers = None
+        self._observations = None
+        self._buffer_index = 0
+        self._final_buffer = None
+        if observation_mode == "buffered":
+            self.set_observation_buffers()
 
         # action space of environment
             # bool - True if banking, False otherwise
@@ -95,23 +346,90 @@ class FarkleEnv(gym.Env):
             }
         )
 
-    def log(self, string):
-        print(f"GAME: {string}")
+    def log(self, string, *args):
+        """
+        logs a message when render_mode is "human". string is %-formatted with args by the logger,
+        and only if the message is emitted, so a disabled log does no string formatting
+        """
+        if self.render_mode == "human":
+            FarkleEnv.logger.info(string, *args)
 
-    def print_dice(self, observation, action):
+    def _dice_lines(self, observation):
         dice = [FarkleEnv.dice_str[x] for x in observation["dice_values"]]
-        
-        for i in range(7):
-            line = [die[i] for die in dice]
-            print(f"{"  ".join(line)}")
+        return ["  ".join(die[i] for die in dice) for i in range(7)]
 
-    def print_lock(self, observation, action):
+    def _lock_line(self, observation, action):
         locked = [FarkleEnv.lock_str[1] if action["lock"][i] or observation["dice_locked"][i] else FarkleEnv.lock_str[0] for i in range(len(observation["dice_locked"]))]
-        print(f"{"  ".join(locked)}")
+        return "  ".join(locked)
+
+    def print_dice(self, observation, action):
+        for line in self._dice_lines(observation):
+            print(line)
+
+    def print_lock(self, observation, action):
+        print(self._lock_line(observation, action))
+
+    def render(self):
+        """
+        renders the current dice and which of them are locked
+
+        Returns
+        -------
+        str or None
+            the rendered dice if render_mode is "ansi". if render_mode is "human" they are printed instead, and None is returned
+        """
+        if self.render_mode is None:
+            return None
+
+        observation = self._live_obs()
+        action = {"lock": [False] * self.dice, "bank": False}
+        if self.render_mode == "ansi":
+            return "\n".join(self._dice_lines(observation) + [self._lock_line(observation, action)])
+
+        self.print_dice(observation, action)
+        self.print_lock(observation, action)
+
+    def enable_profiling(self):
+        """
+        starts counting the calls to each phase of a step and timing them, see stats.
+        the methods in profiled_methods are wrapped on this instance only, so an environment
+        that is not profiled runs exactly the same code as before
+        """
+        if self._stats is None:
+            self._stats = {}
+            utility.profile_methods(self, FarkleEnv.profiled_methods, self._stats)
+
+    def disable_profiling(self):
+        """
+        stops profiling and drops the stats collected
+        """
+        utility.unprofile_methods(self, FarkleEnv.profiled_methods)
+        self._stats = None
+
+    def stats(self):
+        """
+        returns the calls and time of each profiled phase since profiling started or reset_stats,
+        name -> {"calls", "total_ns", "mean_ns"}. times include the phases a phase calls,
+        e.g. check_legal includes _check_lock_index. scoring a lock is _lock_points. empty when not profiling
+        """
+        return utility.summarize_stats(self._stats or {})
+
+    def reset_stats(self):
+        if self._stats is not None:
+            for record in self._stats.values():
+                record[:] = [0, 0]
 
     def _get_obs(self):
         """
         Get the current observation of the game state.
+
+        What the arrays of an observation are depends on observation_mode:
+            - "live": the environment's own arrays, which change in place as the game goes on,
+                including across turns and games. an observation only holds until the next call
+                to the environment, and must not be modified
+            - "copy": fresh copies, which the caller owns
+            - "buffered": the arrays of a preallocated buffer, see set_observation_buffers.
+                nothing is allocated, and an observation holds until the buffer is written again
     
         Returns
         -------
@@ -122,9 +440,92 @@ class FarkleEnv(gym.Env):
                 0 if the corresponding dice is unlocked, 1 otherwise
             - "player_points": array of each player's total points
             - "turn": index of the current player's turn
-            - "points_this_turn": points accumulated by the active player this turn
+            - "points_this_turn": points accumulated by the active player this turn, as a 0-d array
+            the arrays are int64, see make_observation_space
+        """
+        if self.observation_mode == "live":
+            return self._live_obs()
+        if self.observation_mode == "copy":
+            return {"dice_values": self._dice_values.copy(), "dice_locked": self._dice_locked.copy(), "player_points": self._player_points.copy(), "turn": self._turn, "points_this_turn": np.array(self._points_this_turn, dtype=np.int64)}
+
+        self._buffer_index = (self._buffer_index + 1) % len(self._observation_buffers)
+        return self._write_obs(self._observation_buffers[self._buffer_index], self._observations[self._buffer_index])
+
+    def _write_obs(self, buffer, observation):
+        """
+        writes the current observation into buffer, returning observation, the dict returned for that buffer
+        """
+        buffer["dice_values"][...] = self._dice_values
+        buffer["dice_locked"][...] = self._dice_locked
+        buffer["player_points"][...] = self._player_points
+        buffer["points_this_turn"][...] = self._points_this_turn
+        if isinstance(buffer["turn"], np.ndarray):
+            buffer["turn"][...] = self._turn
+        else:
+            observation["turn"] = self._turn
+        return observation
+
+    def _live_obs(self):
+        """
+        returns the current observation as in "live" mode, whatever the observation_mode, see _get_obs.
+        for reading the state without writing an observation buffer
+        """
+        return {"dice_values": self._dice_values, "dice_locked": self._dice_locked, "player_points": self._player_points, "turn": self._turn, "points_this_turn": np.array(self._points_this_turn, dtype=np.int64)}
+
+    def make_observation_buffer(self):
         """
-        return {"dice_values": self._dice_values, "dice_locked": self._dice_locked, "player_points": self._player_points, "turn": self._turn, "points_this_turn": self._points_this_turn}
+        returns a buffer an observation of this environment can be written into, see set_observation_buffers:
+        a dict with the keys of _get_obs, of zeroed int64 arrays of the shapes of the observation space, and turn 0
+        """
+        return {
+            "dice_values": np.ones(self.dice, dtype=np.int64),
+            "dice_locked": np.zeros(self.dice, dtype=np.int64),
+            "player_points": np.zeros(self.players, dtype=np.int64),
+            "turn": 0,
+            "points_this_turn": np.zeros((), dtype=np.int64),
+        }
+
+    def _read_only_buffer(self):
+        """
+        returns a new buffer, see make_observation_buffer, and the observation returned for it, of read-only views of its arrays
+        """
+        buffer = self.make_observation_buffer()
+        observation = {}
+        for key, value in buffer.items():
+            if isinstance(value, np.ndarray):
+                value = value.view()
+                value.flags.writeable = False
+            observation[key] = value
+        return buffer, observation
+
+    def set_observation_buffers(self, buffers = None):
+        """
+        switches to "buffered" observations, each written into the next of buffers in turn.
+
+        By default, the environment owns two buffers, and returns read-only views of them, so the
+        previous observation still holds while the current one is handled, e.g. to store a transition
+        between them. The final observation of a turn in auto_advance mode is written into a
+        separate read-only buffer of the environment, so it does not take a turn of the others.
+
+        Parameters
+        ----------
+        buffers: list[dict], optional
+            buffers owned by the caller instead, each a dict with the keys of _get_obs, of int64 arrays
+            of the shapes of make_observation_buffer, e.g. rows of larger arrays that collect a rollout
+            (points_this_turn must then be a 0-d view, such as points[i, ...]). turn is written in place
+            if it is a 0-d array. observations are then these dicts themselves, and hold until the
+            environment comes back around to them, len(buffers) observations later
+        """
+        if buffers is None:
+            buffers, observations = zip(*(self._read_only_buffer() for _ in range(2)))
+        else:
+            assert len(buffers) > 0
+            observations = buffers
+        self.observation_mode = "buffered"
+        self._observation_buffers = list(buffers)
+        self._observations = list(observations)
+        self._buffer_index = len(buffers) - 1
+        self._final_buffer = self._read_only_buffer()
 
     def _get_info(self, bank=False):
         """
@@ -136,23 +537,38 @@ class FarkleEnv(gym.Env):
             Contains:
             - "farkle": bool, whether current dice state is a Farkle
             - "winner": int, index of winning player if any, else -1
+            - "action_mask": np.ndarray, legal actions as returned by action_mask().
+                only present if the environment was created with action_masks=True
         """
-        return {
+        info = {
             "farkle": self.check_farkle(self._dice_values, self._dice_locked, bank), 
             "winner": self._check_win(),
         }
+        if self._action_masks:
+            info["action_mask"] = self.action_mask()
+        return info
 
     def reset(self, seed = None, options = None):
         self.log("resetting FarkleEnv...")
         super().reset(seed=seed)
+        if seed is not None:
+            # super().reset replaced the generator, so rolls already drawn from the old one are dropped
+            self._dice_stream = DiceStream(self.np_random)
 
         # reset private representation of the game
-        self._dice_locked = np.array([0 for _ in range(self.dice)], dtype=int) 
-        self._player_points = np.array([0 for _ in range(self.players)], dtype=int)
+        self._dice_locked.fill(0)
+        self._player_points.fill(0)
         self._points_this_turn = 0
         self._turn = 0
-        self._dice_values = self.observation_space["dice_values"].sample() # just sample to simulate the first dice roll of a game
+        self._dice_values[:] = self._dice_stream.roll(self.dice) # simulate the first dice roll of a game
+        self._unlocked_index = FarkleEnv._packed_index(self._dice_values)
 
+        if self.auto_advance:
+            skipped, skipped_observations = self._skip_farkled_turns()
+            info = self._get_info()
+            info["skipped_turns"] = skipped
+            info["skipped_observations"] = skipped_observations
+            return self._get_obs(), info
 
         observation = self._get_obs()
         info = self._get_info()
@@ -162,24 +578,95 @@ class FarkleEnv(gym.Env):
     # this is called to partially reset the environment state when a player ends their turn
     def _new_round(self):
         # partially reset private representation of the game
-        self._dice_locked = np.array([0 for _ in range(self.dice)], dtype=int) 
+        self._dice_locked.fill(0)
         self._points_this_turn = 0
         self._turn = (self._turn + 1) % self.players
-        self._dice_values = self.observation_space["dice_values"].sample() # just sample to simulate the first dice roll of a game
-        self.log(f"New round! Player {self._turn}, you're up!")
+        self._dice_values[:] = self._dice_stream.roll(self.dice) # simulate the first dice roll of a game
+        self._unlocked_index = FarkleEnv._packed_index(self._dice_values)
+        self.log("New round! Player %s, you're up!", self._turn)
+
+        if self.render_mode == "human":
+            self.render()
 
-        temp_obs = self._get_obs()
-        temp_action = {"lock": [False] * self.dice, "bank": False}
-        self.print_dice(temp_obs, temp_action)
-        self.print_lock(temp_obs, temp_action)
+    def _skip_farkled_turns(self):
+        """
+        starts new rounds until the player to move did not farkle off the bat
+
+        Returns
+        -------
+        list[int]
+            the players whose turn was skipped
+        list[dict]
+            a copy of the observation each of them farkled on, the one acknowledge_farkle would have followed
+        """
+        skipped = []
+        observations = []
+        while self.check_farkle(self._dice_values, self._dice_locked):
+            self.log("Player %s farkled off the bat! Skipping their turn.", self._turn)
+            skipped.append(self._turn)
+            observations.append(self._copy_obs())
+            self._new_round()
+        return skipped, observations
+
+    def _copy_obs(self):
+        """
+        returns a copy of the current observation, which the caller owns whatever the observation_mode
+        """
+        return {key: value.copy() if isinstance(value, np.ndarray) else value for key, value in self._live_obs().items()}
+
+    def _advance(self, reward, farkle):
+        """
+        ends the turn of the player to move in auto_advance mode, in place of acknowledge_bank
+        and acknowledge_farkle, and starts the turn of the next player to roll without farkling
+
+        Parameters
+        ----------
+        reward: int
+            the reward of the step that ended the turn
+        farkle: bool
+            whether the turn ended in a farkle rather than a bank
+
+        Returns
+        -------
+        tuple
+            what step returns, with the observation of the next turn and the info keys of _get_info, plus:
+            - "turn_ended": True
+            - "turn_reward": the reward of the player whose turn ended
+            - "turn_farkled": whether it ended in a farkle
+            - "final_observation": the observation the turn ended on. a copy in "live" mode, since the
+                arrays of the environment move on to the next turn, and in "buffered" mode the observation
+                of a separate buffer, which holds until the next turn ends, see set_observation_buffers
+            - "skipped_turns": the players after them whose turns farkled off the bat, each rewarded -1
+            - "skipped_observations": a copy of the observation each of them farkled on
+        """
+        if self.observation_mode == "live":
+            final_observation = self._copy_obs()
+        elif self.observation_mode == "copy":
+            final_observation = self._get_obs()
+        else:
+            final_observation = self._write_obs(*self._final_buffer)
+        self._new_round()
+        skipped, skipped_observations = self._skip_farkled_turns()
+
+        info = self._get_info()
+        info["turn_ended"] = True
+        info["turn_reward"] = reward
+        info["turn_farkled"] = farkle
+        info["final_observation"] = final_observation
+        info["skipped_turns"] = skipped
+        info["skipped_observations"] = skipped_observations
+        return self._get_obs(), reward, False, False, info
 
     def _roll_unlocked_dice(self):
         """
         Reroll all dice that are not locked, updating their values in place.
         """
         self.log("Rolling...")
-        new_values = self.observation_space["dice_values"].sample()
-        self._dice_values[self._dice_locked == 0] = new_values[self._dice_locked == 0]   # replace old dice values with new dice values in all indices where the dice are unlocked
+        unlocked = self._dice_locked == 0
+        rolls = self._dice_stream.roll(np.count_nonzero(unlocked))
+        self._dice_values[unlocked] = rolls   # replace old dice values with new dice values in all indices where the dice are unlocked
+        # every unlocked die was rolled, so the histogram of the unlocked dice is the one of the rolls
+        self._unlocked_index = FarkleEnv._packed_index(rolls)
 
     def _check_hot_dice(self, dice_locked):
         """
@@ -201,57 +688,334 @@ class FarkleEnv(gym.Env):
         # partially reset private representation of dice
         # do not change turn or reset points_this_turn
         self.log("Hot dice!")
-        self._dice_values = self.observation_space["dice_values"].sample()
-        self._dice_locked = np.array([0 for _ in range(self.dice)], dtype=int) 
+        self._dice_values[:] = self._dice_stream.roll(self.dice)
+        self._unlocked_index = FarkleEnv._packed_index(self._dice_values)
+        self._dice_locked.fill(0)
+
+    def get_state(self):
+        """
+        takes a snapshot of the game, including the position of the dice rolls, to restore with set_state.
+        meant for search-based players that try many actions from the same state
+
+        Returns
+        -------
+        EnvState
+            the snapshot
+        """
+        return EnvState(
+            self._dice_values.copy(),
+            self._dice_locked.copy(),
+            self._player_points.copy(),
+            self._points_this_turn,
+            self._turn,
+            self._dice_stream.get_state(),
+            self._unlocked_index,
+        )
+
+    def set_state(self, state):
+        """
+        restores a snapshot taken by get_state, after which the game continues with the same dice rolls
+        as it did from the snapshot. a snapshot can be restored any number of times
+
+        Parameters
+        ----------
+        state: EnvState
+            the snapshot, taken from this environment or one with the same number of players and dice
+        """
+        self._dice_values[:] = state.dice_values
+        self._dice_locked[:] = state.dice_locked
+        self._player_points[:] = state.player_points
+        self._points_this_turn = state.points_this_turn
+        self._turn = state.turn
+        self._dice_stream.set_state(state.dice_stream)
+        self._unlocked_index = state.unlocked_index
+
+    def clone(self):
+        """
+        returns an independent copy of the environment in its current state, with its own generator,
+        that rolls the same dice as this one from now on. spaces and settings are shared, profiling is not
+        """
+        env = copy.copy(self)
+        # the profiling wrappers are bound to this environment, so clones are not profiled
+        utility.unprofile_methods(env, FarkleEnv.profiled_methods)
+        env._stats = None
+        env._dice_stream = self._dice_stream.clone()
+        env._np_random = env._dice_stream._generator
+        env._dice_values = self._dice_values.copy()
+        env._dice_locked = self._dice_locked.copy()
+        env._player_points = self._player_points.copy()
+        if self._observation_buffers is not None:
+            # observations of the clone are never written into the buffers of this environment, or of its caller
+            env.set_observation_buffers()
+        return env
 
     def check_lock_legal(self, action):
+        self._check_lock_index(action)
+        return True
+
+    def _check_lock_index(self, action):
+        """
+        asserts the lock of an action is legal, see check_lock_legal, and returns the packed multiset index
+        of the dice it locks, so callers can score it without packing it again
+        """
         lock_action = action["lock"]
         assert len(lock_action) == self.dice
-        for lock, already_locked in zip(lock_action, self._dice_locked):
-            assert not (already_locked == 1 and lock == 1)
+        index = 0
+        for lock, already_locked, die in zip(lock_action, self._dice_locked, self._dice_values):
+            if lock:
+                assert already_locked != 1
+                index += FarkleEnv._die_weight[die]
 
-        if not all(x == 0 for x in lock_action):    # if the player is locking anything, make sure it's valid
-            assert self.verify_combo(self._dice_values, lock_action)
-            assert self.calculate_points(self._dice_values, lock_action) != 0
+        if index:    # if the player is locking anything, make sure it's valid
+            assert FarkleEnv._combo_table[index]
+            assert FarkleEnv._score_table[index] != 0
 
-        return True
+        return index
 
-    def check_bank_legal(self, action):
-        if action["bank"]:
-            assert self._points_this_turn + self._player_points[self._turn] + self.calculate_points(self._dice_values, action["lock"]) >= 500
+    def _lock_points(self, index):
+        """
+        returns the points scored by locking the dice of a packed multiset index, see _check_lock_index
+        """
+        return int(FarkleEnv._score_table[index])
 
-        return True
+    @staticmethod
+    def get_legal_lock_masks(dice_values, dice_locked):
+        """
+        Returns every legal selection of dice to lock as a bit mask.
 
-    def _update_locks(self, lock_action):
-        for i, lock in enumerate(lock_action):
-            self._dice_locked[i] += lock
+        Bit i of a mask is set if die i is locked by the selection. A selection is legal if
+        it only contains unlocked dice and those dice are made up entirely of scoring
+        combinations (see `check_lock_legal`). Locking nothing is always legal and is not included.
+
+        Parameters
+        ----------
+        dice_values: array-like
+            the value of each die
+        dice_locked: array-like
+            0 in indices where the corresponding dice is unlocked, 1 otherwise
+
+        Returns
+        -------
+        tuple[int]
+            the legal lock masks, in increasing order
+        """
+        locked_mask = 0
+        for i, lock in enumerate(dice_locked):
+            if lock:
+                locked_mask |= 1 << i
+        return FarkleEnv._get_legal_locks(tuple(int(x) for x in dice_values), locked_mask)[0]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1 << 16)
+    def _get_legal_locks(dice_values, locked_mask):
+        """
+        memoized body of `get_legal_lock_masks`, keyed by the tuple of dice values and the mask of locked dice.
+        there are 6**6 * 64 possible keys, so the cache is bounded rather than filled up front
+
+        Returns
+        -------
+        tuple[tuple[int], tuple[int]]
+            the legal lock masks, and the points scored by locking each of them
+        """
+        index = [0] * (1 << len(dice_values))
+        legal = []
+        points = []
+        for mask in range(1, 1 << len(dice_values)):
+            lowest = mask & -mask
+            # the packed multiset of a mask is the one of the mask without its lowest die, plus that die
+            index[mask] = index[mask ^ lowest] + FarkleEnv._die_weight[dice_values[lowest.bit_length() - 1]]
+            if not mask & locked_mask and FarkleEnv._combo_table[index[mask]]:
+                legal.append(mask)
+                points.append(int(FarkleEnv._score_table[index[mask]]))
+        return tuple(legal), tuple(points)
+
+    @staticmethod
+    def mask_to_lock(mask, dice = 6):
+        """
+        converts a lock bit mask into the lock array expected in an action
+
+        Parameters
+        ----------
+        mask: int
+            bit i is set if die i is locked
+        dice: int
+            the number of dice
+
+        Returns
+        -------
+        np.ndarray
+            1 in indices where the corresponding die is locked, 0 otherwise
+        """
+        return np.array([(mask >> i) & 1 for i in range(dice)], dtype=int)
 
-    def _helper_flip_lock(self, string, dice_values, dice_locked):
+    def legal_lock_masks(self):
         """
-        returns a new array of which dice are locked after the player has attempted to lock a combination of dice
+        returns the legal lock masks for the current dice, see `get_legal_lock_masks`
+        """
+        return FarkleEnv.get_legal_lock_masks(self._dice_values, self._dice_locked)
+
+    def action_mask(self):
+        """
+        returns which actions are legal in the current state, without probing them one by one with check_legal
+
+        Returns
+        -------
+        np.ndarray
+            boolean array of shape (2, 2**dice). entry [bank, mask] is True if locking the dice in the
+            bit mask `mask` (see `get_legal_lock_masks`) and banking if `bank` is 1 passes check_legal.
+            [0, 0], rerolling without locking anything, is always legal
+        """
+        locked_mask = 0
+        for i, lock in enumerate(self._dice_locked):
+            if lock:
+                locked_mask |= 1 << i
+        masks, points = FarkleEnv._get_legal_locks(tuple(int(x) for x in self._dice_values), locked_mask)
+        banked = self._player_points[self._turn] + self._points_this_turn
+
+        action_mask = np.zeros((2, 1 << self.dice), dtype=bool)
+        action_mask[0, 0] = True
+        action_mask[1, 0] = banked >= 500
+        for mask, mask_points in zip(masks, points):
+            action_mask[0, mask] = True
+            action_mask[1, mask] = banked + mask_points >= 500
+        return action_mask
+
+    @staticmethod
+    def canonical_order(dice_values, dice_locked):
+        """
+        returns the order the dice of a state are listed in once canonicalized:
+        unlocked dice first by increasing value, then locked dice
 
         Parameters
         ----------
-        string: string
-            a string indicating the values of the dice the player is trying to lock
         dice_values: array-like
-            an array of integers indicating the value of each die in each position
+            the value of each die
         dice_locked: array-like
-            0 if the die is unlocked, 1 otherwise
+            0 in indices where the corresponding dice is unlocked, 1 otherwise
 
         Returns
         -------
-        new_locked: array-like
-            0 if the die was previously locked, but we are unlocking it by redeeming some combination of points, 1 otherwise
-        """
-        new_locked = [x for x in dice_locked]
-        for char in string:
-            x = int(char)
-            for i, value in enumerate(dice_values): # we find a dice of matching value and undo the lock
-                if value == x and new_locked[i]:
-                    new_locked[i] = 0
-                    break
-        return new_locked
+        list[int]
+            indices of the dice, in canonical order
+        """
+        return sorted(range(len(dice_values)), key=lambda i: (bool(dice_locked[i]), dice_values[i]))
+
+    def encode_state(self, observation = None):
+        """
+        packs a state of the game into a single integer, the canonical state id.
+
+        Only what the rules depend on is kept, so states that can only be told apart by the
+        order of the dice, or by the values of dice that are already locked, share an id.
+        From the lowest bits up, the id holds:
+            - the rank of the multiset of unlocked dice values in `_multisets` (`_dice_bits` bits)
+            - points_this_turn // 50
+            - turn
+            - player_points[i] // 50 of each player i
+        For a given environment, every id fits in `state_bits` bits.
+
+        Parameters
+        ----------
+        observation: dict, optional
+            an observation of this environment, the current state if omitted
+
+        Returns
+        -------
+        int
+            the canonical state id
+        """
+        if observation is None:
+            observation = self._live_obs()
+
+        index = 0
+        for value, locked in zip(observation["dice_values"], observation["dice_locked"]):
+            if not locked:
+                index += FarkleEnv._die_weight[value]
+        state = int(FarkleEnv._multiset_rank[index])
+
+        points_cap = (1 << self._points_bits) - 1
+        shift = FarkleEnv._dice_bits
+        state |= min(int(observation["points_this_turn"]) // 50, points_cap) << shift
+        shift += self._points_bits
+        state |= int(observation["turn"]) << shift
+        shift += self._turn_bits
+        for points in observation["player_points"]:
+            state |= min(int(points) // 50, points_cap) << shift
+            shift += self._points_bits
+        return state
+
+    def decode_state(self, state):
+        """
+        unpacks a canonical state id, see encode_state.
+
+        The dice are returned in canonical order (see canonical_order): unlocked dice first by
+        increasing value, then locked dice. The values of locked dice are not part of the id,
+        and are decoded as 1.
+
+        Parameters
+        ----------
+        state: int
+            a canonical state id of this environment
+
+        Returns
+        -------
+        dict
+            an observation, with the keys of _get_obs
+        """
+        points_mask = (1 << self._points_bits) - 1
+        counts = FarkleEnv._multisets[state & ((1 << FarkleEnv._dice_bits) - 1)]
+        dice_values = [value for value in range(1, 7) for _ in range(counts[value - 1])]
+        unlocked = len(dice_values)
+        dice_values += [1] * (self.dice - unlocked)
+
+        shift = FarkleEnv._dice_bits
+        points_this_turn = ((state >> shift) & points_mask) * 50
+        shift += self._points_bits
+        turn = (state >> shift) & ((1 << self._turn_bits) - 1)
+        shift += self._turn_bits
+        player_points = []
+        for _ in range(self.players):
+            player_points.append(((state >> shift) & points_mask) * 50)
+            shift += self._points_bits
+
+        return {
+            "dice_values": np.array(dice_values, dtype=np.int64),
+            "dice_locked": np.array([0] * unlocked + [1] * (self.dice - unlocked), dtype=np.int64),
+            "player_points": np.array(player_points, dtype=np.int64),
+            "turn": turn,
+            "points_this_turn": np.array(points_this_turn, dtype=np.int64),
+        }
+
+    def check_bank_legal(self, action):
+        if action["bank"]:
+            assert self._points_this_turn + self._player_points[self._turn] + self.calculate_points(self._dice_values, action["lock"]) >= 500
+
+        return True
+
+    def _update_locks(self, lock_action):
+        """
+        locks the dice of a lock action, taking them out of the histogram of unlocked dice
+
+        Returns
+        -------
+        int
+            the packed multiset index of the dice locked, see `_die_weight`
+        """
+        index = 0
+        for i, lock in enumerate(lock_action):
+            if lock:
+                self._dice_locked[i] += lock
+                index += FarkleEnv._die_weight[self._dice_values[i]]
+        self._unlocked_index -= index
+        return index
+
+    @staticmethod
+    def _packed_index(dice_values, dice_mask = None):
+        """
+        returns the packed multiset index (see `_die_weight`) of the dice values where dice_mask is truthy, all of them if omitted
+        """
+        if dice_mask is None:
+            return sum(FarkleEnv._die_weight[die] for die in dice_values)
+        return sum(FarkleEnv._die_weight[die] for die, selected in zip(dice_values, dice_mask) if selected)
 
     # checks if any player has win, returning the player number if so, -1 otherwise
     def _check_win(self):
@@ -271,7 +1035,8 @@ class FarkleEnv(gym.Env):
 
     def calculate_points(self, dice_values, lock_action):
         """
-        checks how many points a player obtained with the dice they locked
+        checks how many points a player obtained with the dice they locked.
+        the locked dice are packed into a multiset index and scored with a lookup in `_score_table`
 
         Parameters
         ---------
@@ -286,26 +1051,7 @@ class FarkleEnv(gym.Env):
         max_points: integer
             the amount of points scored by the player's lock actions
         """
-        locked = []
-        num_locked = 0
-        for lock, die in zip(lock_action, dice_values):
-            if lock:
-                locked.append(die)
-                num_locked += 1
-
-        locked.sort()
-        locked = [str(x) for x in locked]
-        string = "".join(locked)
-        max_points = 0
-        for i in range(num_locked, 0, -1):
-            for dict in FarkleEnv.combinations[i]:
-                for key in dict.keys():
-                    if key in string:
-                        current_points = dict[key]
-                        current_points += self.calculate_points(dice_values, self._helper_flip_lock(key, dice_values, lock_action)) 
-                        max_points = max(current_points, max_points)
-
-        return max_points
+        return int(FarkleEnv._score_table[FarkleEnv._packed_index(dice_values, lock_action)])
 
     def verify_combo(self, dice_values, lock_action):
         """
@@ -323,29 +1069,12 @@ class FarkleEnv(gym.Env):
         Returns
         -------
         valid: bool
-            True if the dice locked correspond to some valid combination, False otherwise
+            True if the dice locked correspond to some valid combination, False otherwise.
+            looked up in `_combo_table`
         """
-        locked = []
-        num_locked = 0
-        for lock, die in zip(lock_action, dice_values):
-            if lock:
-                locked.append(die)
-                num_locked += 1
-
-        locked.sort()
-        locked = [str(x) for x in locked]
-        string = "".join(locked)
-        for i in range(num_locked, 0, -1):
-            for dict in FarkleEnv.combinations[i]:
-                for key in dict.keys():
-                    if key in string:
-                        new_lock_action = self._helper_flip_lock(key, dice_values, lock_action)
-                        if all(x == 0 for x in new_lock_action):
-                            return True
-                        if self.verify_combo(dice_values, new_lock_action): # if the currently found combination does not account for all the locked die, maybe this combination and some other with the remaining dice will
-                            return True
-
-        return False
+        index = FarkleEnv._packed_index(dice_values, lock_action)
+        # locking nothing is not a combination
+        return bool(index) and bool(FarkleEnv._combo_table[index])
 
     def check_farkle(self, dice_values, dice_locked, bank=False):
         """
@@ -362,30 +1091,26 @@ class FarkleEnv(gym.Env):
         Returns
         -------
         bool
-            True is the player farkled
+            True is the player farkled. the dice of the environment are looked up with their
+            histogram kept up to date, see `_unlocked_index`, others are packed first
         """
         if bank:
             return False
-        # do not check if a player has won.
+        # return True if player farkled, return False otherwise
+        if dice_values is self._dice_values and dice_locked is self._dice_locked:
+            index = self._unlocked_index
+        else:
+            index = 0
+            for die, lock in zip(dice_values, dice_locked):
+                if not lock:
+                    index += FarkleEnv._die_weight[die]
+        # the player did not farkle if there is at least one redeemable combination among the unlocked dice
+        if FarkleEnv._score_table[index]:
+            return False
+        # do not check if a player has won. only checked once the dice farkled, as it is the slower check
         if np.any(self._player_points > self.max_points):
             return False
-        # return True if player farkled, return False otherwise
-        unlocked = []
-        num_unlocked = 0
-        for lock, die in zip(dice_locked, dice_values):
-            if not lock:
-                unlocked.append(die)
-                num_unlocked += 1
-
-        unlocked.sort()
-        unlocked = [str(x) for x in unlocked]
-        string = "".join(unlocked)
-        for i in range(1, num_unlocked+1):
-            for dict in FarkleEnv.combinations[i]:
-                for key in dict.keys():
-                    if key in string:
-                        return False # the player did not farkle, there is at least one redeemable combination
-        self.log(f"check_farkle found that Player {self._turn} farkled!")
+        self.log("check_farkle found that Player %s farkled!", self._turn)
         return True
 
     def check_legal(self, action):
@@ -393,13 +1118,13 @@ class FarkleEnv(gym.Env):
         checks if a player's action is legal
         """
         try:
-            self.check_lock_legal(action)
+            index = self._check_lock_index(action)
         except AssertionError:
-            self.log(f"Player {self._turn} attempted to lock illegal dice") 
+            self.log("Player %s attempted to lock illegal dice", self._turn)
             return False
 
-        if action["bank"] and (self._player_points[self._turn] + self._points_this_turn + self.calculate_points(self._dice_values, action["lock"]) < 500):
-            self.log(f"Player {self._turn} attempted to bank illegally")
+        if action["bank"] and (self._player_points[self._turn] + self._points_this_turn + FarkleEnv._score_table[index] < 500):
+            self.log("Player %s attempted to bank illegally", self._turn)
             return False
 
         return True
@@ -419,7 +1144,7 @@ class FarkleEnv(gym.Env):
 
         reward = -1 if info["farkle"] else 0
         if info["farkle"]:
-            self.log(f"Player {observation["turn"]} farkled off the bat! Expecting acknowledgement...")
+            self.log("Player %s farkled off the bat! Expecting acknowledgement...", observation["turn"])
 
         return observation, reward, terminated, truncated, info
 
@@ -438,7 +1163,7 @@ class FarkleEnv(gym.Env):
 
         reward = -1 if info["farkle"] else 0
         if info["farkle"]:
-            self.log(f"Player {observation["turn"]} farkled off the bat! Expecting acknowledgement...")
+            self.log("Player %s farkled off the bat! Expecting acknowledgement...", observation["turn"])
 
         return observation, reward, terminated, truncated, info
 
@@ -452,6 +1177,8 @@ class FarkleEnv(gym.Env):
                 the next FarkleEnv function called needs to be acknowledge_bank() by the controller
             3) player does not bank, locks dice but then farkles. this function returns the reward to the player to allow them to update.
             4) the player does not bank, locks dice but then does not farkle. this function returns the game state to the player to allow them to continue their turn
+            in auto_advance mode, 2) and 3) start the next player's turn themselves and return its observation, with the
+            reward of the turn that ended in info, see _advance. info["turn_ended"] tells the four cases apart
 
         Parameters
         ---------
@@ -474,26 +1201,31 @@ class FarkleEnv(gym.Env):
         terminated = False
 
         self.log("Updating locks")
-        self._update_locks(action["lock"])
+        index = self._update_locks(action["lock"])
 
-        points = self.calculate_points(self._dice_values, action["lock"]) # calculate the number of points scored by this action by using which dice were locked (THIS ACTION) by the player
-        self.log(f"Player's action received {points}.")
+        points = self._lock_points(index) # the number of points scored by the dice locked by THIS ACTION
+        self.log("Player's action received %s.", points)
         self._points_this_turn += points
-        self.log(f"Player now has {self._points_this_turn} this turn.")
+        self.log("Player now has %s this turn.", self._points_this_turn)
 
         if self._points_this_turn + self._player_points[self._turn] >= self.max_points:
-            self.log(f"Player {self._turn} has over {self.max_points}! They win!")
+            self.log("Player %s has over %s! They win!", self._turn, self.max_points)
             terminated = True
             self._player_points[self._turn] += self._points_this_turn
             reward = 0
             observation = self._get_obs()
             info = self._get_info()
+            if self.auto_advance:
+                info["turn_ended"] = True
             return observation, reward, terminated, truncated, info
         
         if action["bank"]:
             self._player_points[self._turn] += self._points_this_turn
-            self.log(f"Player {self._turn} banks. Expecting bank acknowledgement.")
             reward = -1
+            if self.auto_advance:
+                self.log("Player %s banks.", self._turn)
+                return self._advance(reward, False)
+            self.log("Player %s banks. Expecting bank acknowledgement.", self._turn)
             observation = self._get_obs()
             info = self._get_info(True)
             return observation, reward, terminated, truncated, info
@@ -504,23 +1236,102 @@ class FarkleEnv(gym.Env):
         else:
             self._roll_unlocked_dice() 
 
-        observation = self._get_obs()
         info = self._get_info()
-        self.print_dice(observation, action)
-        self.print_lock(observation, action)
+        if self.render_mode == "human":
+            self.print_dice(self._live_obs(), action)
+            self.print_lock(self._live_obs(), action)
         # in both of these cases, player may have farkled
         if info["farkle"]:
-            self.log(f"Player {self._turn} farkled. Expecting farkle acknowledgement.")
             reward = -1
-            return observation, reward, terminated, truncated, info
+            if self.auto_advance:
+                self.log("Player %s farkled.", self._turn)
+                # the observation is only written once the turn has ended, so it does not take up a buffer, see _advance
+                return self._advance(reward, True)
+            self.log("Player %s farkled. Expecting farkle acknowledgement.", self._turn)
+            return self._get_obs(), reward, terminated, truncated, info
 
         reward = 0
-        return observation, reward, terminated, truncated, info
+        if self.auto_advance:
+            info["turn_ended"] = False
+        return self._get_obs(), reward, terminated, truncated, info
+
+# FarkleEnv._die_weight as an array, to pack whole batches of dice at once
+_die_weights = np.array(FarkleEnv._die_weight, dtype=np.int64)
+
+def packed_index_batch(dice_values, dice_mask):
+    """
+    packs the dice selected by dice_mask into multiset indices of FarkleEnv._score_table and
+    FarkleEnv._combo_table, over the last axis. leading axes broadcast against each other
+
+    Parameters
+    ----------
+    dice_values: array-like
+        (..., dice) values of the dice
+    dice_mask: array-like
+        (..., dice) 1 where the die is selected, 0 otherwise
+
+    Returns
+    -------
+    np.ndarray
+        (...) int64 packed multiset indices
+    """
+    return (_die_weights[np.asarray(dice_values)] * np.asarray(dice_mask)).sum(axis=-1)
+
+def calculate_points_batch(dice_values, lock):
+    """
+    scores many locks at once, like FarkleEnv.calculate_points
+
+    Parameters
+    ----------
+    dice_values: array-like
+        (N, dice) values of the dice, or any (..., dice) shape broadcasting against lock
+    lock: array-like
+        (N, dice) 1 where the die is locked by the action, 0 otherwise
+
+    Returns
+    -------
+    np.ndarray
+        (N,) int64 points of each lock
+    """
+    return FarkleEnv._score_table[packed_index_batch(dice_values, lock)].astype(np.int64)
+
+def verify_combo_batch(dice_values, lock):
+    """
+    checks many locks at once, like FarkleEnv.verify_combo: True where the locked dice are made
+    up entirely of scoring combinations. locking nothing is not a combination
+
+    Returns
+    -------
+    np.ndarray
+        (N,) bool
+    """
+    index = packed_index_batch(dice_values, lock)
+    return FarkleEnv._combo_table[index] & (index != 0)
+
+def is_farkle_batch(dice_values, dice_locked):
+    """
+    checks many rolls at once for a farkle: True where no unlocked die can score.
+    unlike FarkleEnv.check_farkle, it only looks at the dice, not whether the game is over
+
+    Parameters
+    ----------
+    dice_values: array-like
+        (N, dice) values of the dice
+    dice_locked: array-like
+        (N, dice) 1 where the die is already locked, 0 otherwise
+
+    Returns
+    -------
+    np.ndarray
+        (N,) bool
+    """
+    return FarkleEnv._score_table[packed_index_batch(dice_values, 1 - np.asarray(dice_locked))] == 0
 
 # register environment
 register(
     id="gymnasium_env/FarkleEnv-v0",
     entry_point=FarkleEnv,
+    vector_entry_point="vector_env:VectorFarkleEnv",
     max_episode_steps=500, # TODO: check if problem
     )
 
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import testing
+import player_testing
+import controller_testing
+
+# controller of the current worker process, built once by _init_worker and reused for every game
+_controller = None
+
+
+def _init_worker(player_factories, max_points):
+    """
+    Builds the environment, players and controller of a worker process.
+
+    Parameters
+    ----------
+    player_factories : list[callable]
+        one picklable callable per seat returning a Player, e.g. player_testing.RandomPlayer
+    max_points : int
+        number of points to win a game
+    """
+    global _controller
+    env = testing.FarkleEnv(players=len(player_factories), max_points=max_points)
+    players = [factory() for factory in player_factories]
+    _controller = controller_testing.FarkleController(env, players)
+    for player in players:
+        player.set_controller(_controller)
+
+def _play_games(games):
+    """
+    Plays a shard of games in a worker process.
+
+    Parameters
+    ----------
+    games : list[tuple[int, int]]
+        (game index, game seed) pairs
+
+    Returns
+    -------
+    list[tuple[int, int, int, tuple[int]]]
+        (game index, winner, turns, final points of each player) for each game
+    """
+    results = []
+    for index, seed in games:
+        # players draw their decisions from the random module, so it is seeded along with the dice
+        random.seed(seed)
+        np.random.seed(seed)
+        winner, turns, player_points = _controller.play_game(seed)
+        results.append((index, int(winner), turns, tuple(int(x) for x in player_points)))
+    return results
+
+def game_seeds(games, seed):
+    """
+    Returns the seed of every game of a tournament. each game's seed only depends on the tournament
+    seed and the game's index, so results do not depend on how games are sharded across workers.
+    """
+    return [int(x) for x in np.random.SeedSequence(seed).generate_state(games, dtype=np.uint32)]
+
+def run_tournament(player_factories, games, seed = 0, workers = None, max_points = 10000, shards_per_worker = 4):
+    """
+    Plays games between the same players across a pool of processes and aggregates the results.
+
+    Parameters
+    ----------
+    player_factories : list[callable]
+        one picklable callable per seat returning a Player, e.g. player_testing.RandomPlayer
+    games : int
+        number of games to play
+    seed : int
+        seed of the tournament, see game_seeds
+    workers : int, optional
+        number of worker processes, defaults to the number of CPUs
+    max_points : int
+        number of points to win a game
+    shards_per_worker : int
+        games are split into workers * shards_per_worker shards, to balance the load between workers
+
+    Returns
+    -------
+    dict
+        - "games": number of games played
+        - "wins": number of games won by each player
+        - "win_rate": fraction of games won by each player
+        - "mean_turns": mean number of turns per game
+        - "mean_points": mean final points of each player
+        - "winner", "turns", "player_points": per-game results as arrays, in game order
+    """
+    workers = workers or os.cpu_count()
+    seeds = game_seeds(games, seed)
+    jobs = list(enumerate(seeds))
+    shard_size = max(1, -(-games // (workers * shards_per_worker)))
+    shards = [jobs[i:i + shard_size] for i in range(0, games, shard_size)]
+
+    winner = np.full(games, -1, dtype=np.int64)
+    turns = np.zeros(games, dtype=np.int64)
+    player_points = np.zeros((games, len(player_factories)), dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(player_factories, max_points)) as executor:
+        for results in executor.map(_play_games, shards):
+            for index, game_winner, game_turns, game_points in results:
+                winner[index] = game_winner
+                turns[index] = game_turns
+                player_points[index] = game_points
+
+    wins = np.bincount(winner[winner >= 0], minlength=len(player_factories))
+    return {
+        "games": games,
+        "wins": wins.tolist(),
+        "win_rate": (wins / max(games, 1)).tolist(),
+        "mean_turns": float(turns.mean()) if games else 0.0,
+        "mean_points": player_points.mean(axis=0).tolist() if games else [0.0] * len(player_factories),
+        "winner": winner,
+        "turns": turns,
+        "player_points": player_points,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="play a Farkle tournament across a pool of processes")
+    parser.add_argument("players", nargs="+", help="names of Player classes in player_testing, one per seat")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-points", type=int, default=10000)
+    args = parser.parse_args()
+
+    factories = [getattr(player_testing, name) for name in args.players]
+    summary = run_tournament(factories, args.games, args.seed, args.workers, args.max_points)
+    json.dump({key: value for key, value in summary.items() if not isinstance(value, np.ndarray)}, sys.stdout, indent=2)
+    print()
@@ -1,3 +1,70 @@
+import functools
+import logging
+import sys
+import time
+
+
+def get_logger(name, prefix):
+    """
+    returns the logger of a part of the game, e.g. "env" or "controller".
+
+    messages are written to stdout as "PREFIX: message". the objects that own a logger only
+    call it when their output is enabled, so the logger itself always lets INFO through.
+    it is a standard logging.Logger named "farkle.<name>", so more handlers can be attached to it
+    """
+    logger = logging.getLogger(f"farkle.{name}")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(f"{prefix}: %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def profile_methods(obj, names, stats):
+    """
+    wraps methods of an object, on the object itself, to count their calls and time them with
+    perf_counter_ns. times are inclusive of the methods they call. the class is untouched, so
+    objects that are not profiled pay nothing, and unprofile_methods restores the object
+
+    Parameters
+    ----------
+    obj : object
+        the object whose methods are profiled
+    names : iterable[str]
+        names of the methods
+    stats : dict
+        filled with name -> [calls, total nanoseconds]
+    """
+    for name in names:
+        method = getattr(obj, name)
+        record = stats.setdefault(name, [0, 0])
+
+        @functools.wraps(method)
+        def profiled(*args, method = method, record = record, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record[0] += 1
+                record[1] += time.perf_counter_ns() - start
+
+        setattr(obj, name, profiled)
+
+def unprofile_methods(obj, names):
+    """
+    removes the wrappers of profile_methods
+    """
+    for name in names:
+        obj.__dict__.pop(name, None)
+
+def summarize_stats(stats):
+    """
+    returns name -> {"calls", "total_ns", "mean_ns"} of the stats filled by profile_methods
+    """
+    return {name: {"calls": calls, "total_ns": total, "mean_ns": total / calls if calls else 0.0} for name, (calls, total) in stats.items()}
+
 
 def get_dice_strings():
     one = [" ----------- ",
@@ -0,0 +1,277 @@
+import numpy as np
+import gymnasium as gym
+from gymnasium.utils import seeding
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+from testing import FarkleEnv, is_farkle_batch, packed_index_batch
+
+
+class VectorFarkleEnv(VectorEnv):
+    """
+    Runs num_envs games of Farkle at once, holding every game in NumPy arrays.
+
+    The rules are the ones of FarkleEnv, scored with the same multiset tables, but every
+    game is stepped together: locks, scoring, rolling, farkle and hot dice detection are
+    all array operations over the batch.
+
+    Unlike FarkleEnv, there is no acknowledge_bank/acknowledge_farkle round-trip. When a
+    player banks or farkles, the next player's turn starts within the same step, and turns
+    that farkle on their very first roll are passed over. Finished games are reset on the
+    following call to step, following gymnasium's next-step autoreset convention.
+    """
+
+    metadata = {"autoreset_mode": gym.vector.AutoresetMode.NEXT_STEP}
+
+    # bit i of lock mask m is set in _mask_bits[m, i]
+    _mask_bits = (np.arange(64)[:, None] >> np.arange(6)) & 1
+
+    def __init__(self, num_envs = 1, players = 1, random_seed = None, max_points = 10000, max_episode_steps = None, action_masks = False):
+        """
+        initializes the VectorFarkleEnv class
+
+        Parameters
+        ----------
+        num_envs: int
+            the number of games played at once
+        players: int
+            the number of players in each game
+        random_seed: int, optional
+            seed of the dice rolls
+        max_points: int
+            number of points to win a game
+        max_episode_steps: int, optional
+            number of steps after which a game is truncated
+        action_masks: bool
+            whether the info dict carries the mask of legal actions of each game, see action_mask()
+        """
+        self.num_envs = num_envs
+        self.players = players
+        self.dice = 6
+        self.max_points = max_points
+        self.max_episode_steps = max_episode_steps
+        self._action_masks = action_masks
+
+        self.single_observation_space = FarkleEnv.make_observation_space(self.players, max_points, self.dice)
+        self.single_action_space = gym.spaces.Dict(
+            {
+                "bank": gym.spaces.MultiBinary(1),
+                "lock": gym.spaces.MultiBinary(self.dice)
+            }
+        )
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        if random_seed is not None:
+            self._np_random, self._np_random_seed = seeding.np_random(random_seed)
+
+        # private representation of the games, one row per game
+        self._rows = np.arange(num_envs)
+        self._dice_values = np.ones((num_envs, self.dice), dtype=np.int64)
+        self._dice_locked = np.zeros((num_envs, self.dice), dtype=np.int64)
+        self._player_points = np.zeros((num_envs, self.players), dtype=np.int64)
+        self._points_this_turn = np.zeros(num_envs, dtype=np.int64)
+        self._turn = np.zeros(num_envs, dtype=np.int64)
+        self._elapsed_steps = np.zeros(num_envs, dtype=np.int64)
+        # games that finished on the previous step, and are reset on the next one
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+
+    def _get_obs(self):
+        """
+        Get the current observation of every game, as copies of the private arrays.
+
+        Returns
+        -------
+        dict
+            the keys of FarkleEnv._get_obs, each batched along a first axis of length num_envs
+        """
+        return {
+            "dice_values": self._dice_values.copy(),
+            "dice_locked": self._dice_locked.copy(),
+            "player_points": self._player_points.copy(),
+            "points_this_turn": self._points_this_turn.copy(),
+            "turn": self._turn.copy(),
+        }
+
+    def _get_info(self, farkle, passed):
+        """
+        Returns additional info about the current state of every game.
+
+        Parameters
+        ----------
+        farkle: np.ndarray
+            whether each game's last step ended in a farkle
+        passed: np.ndarray
+            number of turns of each game passed over by the last step, see _new_round
+
+        Returns
+        -------
+        dict
+            Contains:
+            - "farkle": bool array, whether the last step of each game ended in a Farkle
+            - "winner": int array, index of the winning player of each game if any, else -1
+            - "passed_turns": int array, number of turns passed over in each game because
+                the player farkled on their first roll
+            - "action_mask": bool array of shape (num_envs, 2, 64), only present if the
+                environment was created with action_masks=True
+        """
+        won = self._player_points >= self.max_points
+        info = {
+            "farkle": farkle,
+            "winner": np.where(won.any(axis=1), won.argmax(axis=1), -1),
+            "passed_turns": passed,
+        }
+        if self._action_masks:
+            info["action_mask"] = self.action_mask()
+        return info
+
+    def _roll(self, reroll):
+        """
+        rerolls the dice where reroll is 1, in every game at once
+        """
+        new_values = self.np_random.integers(1, 7, size=self._dice_values.shape)
+        np.copyto(self._dice_values, new_values, where=reroll.astype(bool))
+
+    def _new_round(self, games):
+        """
+        moves the games selected by the boolean array games to the next player's turn.
+        players that farkle on their first roll are passed over until somebody can score
+
+        Returns
+        -------
+        np.ndarray
+            the number of turns that were passed over in each game
+        """
+        passed = np.zeros(self.num_envs, dtype=np.int64)
+        while games.any():
+            self._dice_locked[games] = 0
+            self._points_this_turn[games] = 0
+            self._turn[games] = (self._turn[games] + 1) % self.players
+            self._roll(np.broadcast_to(games[:, None], self._dice_values.shape))
+            games = games & is_farkle_batch(self._dice_values, self._dice_locked)
+            passed += games
+        return passed
+
+    def _reset_games(self, games):
+        """
+        starts new games in the rows selected by the boolean array games
+
+        Returns
+        -------
+        np.ndarray
+            the number of turns that were passed over in each game, see _new_round
+        """
+        self._player_points[games] = 0
+        self._elapsed_steps[games] = 0
+        # _new_round moves to the next player, so start from the last one to give player 0 the first turn
+        self._turn[games] = self.players - 1
+        return self._new_round(games)
+
+    def action_mask(self):
+        """
+        returns which actions are legal in every game, see FarkleEnv.action_mask
+
+        Returns
+        -------
+        np.ndarray
+            boolean array of shape (num_envs, 2, 64), entry [n, bank, mask] is True if the action is legal in game n
+        """
+        unlocked_bits = VectorFarkleEnv._mask_bits * (1 - self._dice_locked[:, None, :])    # (num_envs, 64, dice)
+        index = packed_index_batch(self._dice_values[:, None, :], unlocked_bits)
+        touches_locked = (VectorFarkleEnv._mask_bits[None, :, :] & self._dice_locked[:, None, :]).any(axis=2)
+        lock_legal = FarkleEnv._combo_table[index] & ~touches_locked
+        lock_legal[:, 0] = True
+
+        banked = self._player_points[self._rows, self._turn] + self._points_this_turn
+        bank_legal = lock_legal & (banked[:, None] + FarkleEnv._score_table[index] >= 500)
+        return np.stack([lock_legal, bank_legal], axis=1)
+
+    def reset(self, seed = None, options = None):
+        """
+        starts a new game in every row
+
+        Returns
+        -------
+        observation: dict
+            batched observation, see _get_obs
+        info: dict
+            batched info, see _get_info
+        """
+        if seed is not None:
+            self._np_random, self._np_random_seed = seeding.np_random(seed)
+
+        self._autoreset[:] = False
+        passed = self._reset_games(np.ones(self.num_envs, dtype=bool))
+
+        return self._get_obs(), self._get_info(np.zeros(self.num_envs, dtype=bool), passed)
+
+    def step(self, actions):
+        """
+        plays one action in every game, following the rules of FarkleEnv.step
+
+        Parameters
+        ---------
+        actions: dict
+            contains "lock": an array of shape (num_envs, 6) with a 1 in each index where the player would like to lock the dice,
+                     "bank": an array of num_envs booleans indicating if the player is banking after this action
+
+        Returns
+        -------
+        observation: dict
+            batched observation, see _get_obs. when a turn ended, it is the observation of the next player
+        reward: np.ndarray
+            -1 in games where the player banked or farkled, 0 otherwise
+        terminated: np.ndarray
+            True in games where the player won
+        truncated: np.ndarray
+            True in games that reached max_episode_steps
+        info: dict
+            batched info, see _get_info
+        """
+        bank = np.asarray(actions["bank"]).reshape(self.num_envs).astype(bool)
+        lock = np.asarray(actions["lock"]).reshape(self.num_envs, self.dice).astype(np.int64)
+
+        # games that finished on the last step are reset, and their actions ignored
+        resetting = self._autoreset.copy()
+        passed = np.zeros(self.num_envs, dtype=np.int64)
+        if resetting.any():
+            passed += self._reset_games(resetting)
+            bank[resetting] = False
+            lock[resetting] = 0
+        playing = ~resetting
+
+        index = packed_index_batch(self._dice_values, lock)
+        points = FarkleEnv._score_table[index]
+        banked = self._player_points[self._rows, self._turn] + self._points_this_turn
+        lock_legal = ~(lock & self._dice_locked).any(axis=1) & (~lock.any(axis=1) | FarkleEnv._combo_table[index])
+        bank_legal = ~bank | (banked + points >= 500)
+        assert np.all(lock_legal & bank_legal)
+
+        self._dice_locked += lock
+        self._points_this_turn += points
+        total = banked + points
+
+        # a player that could win with the dice they locked does so automatically
+        won = playing & (total >= self.max_points)
+        banking = playing & bank & ~won
+        ending = won | banking
+        self._player_points[self._rows[ending], self._turn[ending]] = total[ending]
+
+        # everyone else rolls again, with all six dice if they locked them all
+        rolling = playing & ~ending
+        hot_dice = rolling & (self._dice_locked == 1).all(axis=1)
+        self._dice_locked[hot_dice] = 0
+        self._roll(rolling[:, None] & (self._dice_locked == 0))
+        farkle = rolling & is_farkle_batch(self._dice_values, self._dice_locked)
+
+        reward = np.where(banking | farkle, -1, 0)
+        passed += self._new_round(banking | farkle)
+
+        self._elapsed_steps[playing] += 1
+        terminated = won
+        if self.max_episode_steps is None:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+        else:
+            truncated = playing & ~won & (self._elapsed_steps >= self.max_episode_steps)
+        self._autoreset = terminated | truncated
+
+        return self._get_obs(), reward, terminated, truncated, self._get_info(farkle, passed)
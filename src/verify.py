@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import testing
+import reference_rules
+
+# every roll of 6 dice, and every lock mask over them: bit i of mask m is set in _mask_bits[m, i]
+ROLLS = 6 ** 6
+_mask_bits = (np.arange(64)[:, None] >> np.arange(6)) & 1
+FUNCTIONS = ("calculate_points", "verify_combo", "check_farkle")
+
+
+def roll_dice(rolls):
+    """
+    returns the dice of roll numbers, the digits of each number in base 6 plus one, as a (len(rolls), 6) array
+    """
+    return np.asarray(rolls)[:, None] // 6 ** np.arange(6) % 6 + 1
+
+def _verify_rolls(job):
+    """
+    Checks the fast rules against the reference on a range of rolls, in a worker process.
+
+    Every roll is checked with every lock mask: calculate_points and verify_combo with the mask
+    as the dice locked by the action, check_farkle with the mask as the dice already locked.
+    The fast rules are FarkleEnv's methods, one call per case, and the batch functions of
+    testing, one call for the whole range.
+
+    Parameters
+    ----------
+    job : tuple[int, int, int]
+        first roll, end of the range of rolls, and most mismatches to report
+
+    Returns
+    -------
+    dict
+        - "cases": number of cases checked
+        - "mismatches": number of mismatching cases of each function
+        - "reports": up to the given number of mismatching cases, in case order
+        - "time_ns": time spent in each implementation of each function
+    """
+    start, stop, max_reports = job
+    env = testing.FarkleEnv()
+    dice = roll_dice(np.arange(start, stop))
+    rolls = [[int(x) for x in row] for row in dice]
+    locks = [[int(x) for x in row] for row in _mask_bits]
+
+    results = {}
+    time_ns = {}
+    implementations = {
+        "reference": {name: getattr(reference_rules, name) for name in FUNCTIONS},
+        "fast": {"calculate_points": env.calculate_points, "verify_combo": env.verify_combo, "check_farkle": env.check_farkle},
+    }
+    for implementation, functions in implementations.items():
+        for name, function in functions.items():
+            began = time.perf_counter_ns()
+            values = [function(roll, lock) for roll in rolls for lock in locks]
+            time_ns[f"{implementation}.{name}"] = time.perf_counter_ns() - began
+            results[f"{implementation}.{name}"] = np.array(values, dtype=np.int64).reshape(len(rolls), 64)
+
+    batch_functions = {"calculate_points": testing.calculate_points_batch, "verify_combo": testing.verify_combo_batch, "check_farkle": testing.is_farkle_batch}
+    for name, function in batch_functions.items():
+        began = time.perf_counter_ns()
+        values = function(dice[:, None, :], _mask_bits[None, :, :])
+        time_ns[f"batch.{name}"] = time.perf_counter_ns() - began
+        results[f"batch.{name}"] = values.astype(np.int64)
+
+    mismatches = {}
+    reports = []
+    for name in FUNCTIONS:
+        reference = results[f"reference.{name}"]
+        wrong = (results[f"fast.{name}"] != reference) | (results[f"batch.{name}"] != reference)
+        mismatches[name] = int(wrong.sum())
+        for row, mask in zip(*np.nonzero(wrong)):
+            reports.append({
+                "function": name,
+                "case": int((start + row) * 64 + mask),
+                "dice": rolls[row],
+                "mask": locks[mask],
+                "reference": int(reference[row, mask]),
+                "fast": int(results[f"fast.{name}"][row, mask]),
+                "batch": int(results[f"batch.{name}"][row, mask]),
+            })
+    reports.sort(key=lambda report: report["case"])
+    return {"cases": len(rolls) * 64, "mismatches": mismatches, "reports": reports[:max_reports], "time_ns": time_ns}
+
+def verify(workers = None, rolls = ROLLS, chunks = None, max_reports = 20):
+    """
+    Checks FarkleEnv's table-driven rules and the batch rules of testing against the original
+    recursive rules of reference_rules, on every roll of 6 dice with every lock mask, and
+    times every implementation.
+
+    Parameters
+    ----------
+    workers : int, optional
+        number of worker processes, defaults to the number of CPUs
+    rolls : int
+        number of rolls to check, from roll 0, all 6**6 of them by default
+    chunks : int, optional
+        number of ranges of rolls the work is split into, defaults to 8 per worker
+    max_reports : int
+        most mismatching cases reported, the first ones in case order
+
+    Returns
+    -------
+    dict
+        - "cases": number of (roll, mask) cases checked
+        - "mismatches": number of mismatching cases of each function
+        - "first_mismatches": the first mismatching cases, see _verify_rolls
+        - "ns_per_case": mean time per case of each implementation of each function, over every worker
+        - "speedup": reference time over the time of each fast implementation, per function
+        - "wall_s": wall time of the verification
+    """
+    workers = workers or os.cpu_count()
+    chunks = chunks or workers * 8
+    bounds = np.linspace(0, rolls, chunks + 1).astype(int)
+    jobs = [(int(start), int(stop), max_reports) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+    began = time.perf_counter()
+    cases = 0
+    mismatches = dict.fromkeys(FUNCTIONS, 0)
+    reports = []
+    time_ns = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_verify_rolls, jobs):
+            cases += result["cases"]
+            for name, count in result["mismatches"].items():
+                mismatches[name] += count
+            reports.extend(result["reports"])
+            for key, elapsed in result["time_ns"].items():
+                time_ns[key] = time_ns.get(key, 0) + elapsed
+
+    return {
+        "cases": cases,
+        "mismatches": mismatches,
+        "first_mismatches": sorted(reports, key=lambda report: report["case"])[:max_reports],
+        "ns_per_case": {key: elapsed / cases for key, elapsed in time_ns.items()},
+        "speedup": {
+            f"{implementation}.{name}": time_ns[f"reference.{name}"] / max(time_ns[f"{implementation}.{name}"], 1)
+            for implementation in ("fast", "batch") for name in FUNCTIONS
+        },
+        "wall_s": time.perf_counter() - began,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="exhaustively check the fast Farkle rules against the reference rules")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rolls", type=int, default=ROLLS, help="number of rolls to check, all of them by default")
+    parser.add_argument("--max-reports", type=int, default=20)
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if omitted")
+    args = parser.parse_args()
+
+    results = verify(args.workers, args.rolls, max_reports=args.max_reports)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    sys.exit(1 if any(results["mismatches"].values()) else 0)
@@ -0,0 +1,87 @@
+import numpy as np
+import gymnasium as gym
+
+
+class DiscreteActionWrapper(gym.ActionWrapper):
+    """
+    Exposes the actions of a FarkleEnv as a single Discrete(2 * 2**dice) space, so value based
+    learners that expect one integer action can play it directly.
+
+    Action index a banks if a // 2**dice is 1, and locks the dice in the bit mask a % 2**dice,
+    where bit i locks die i. This is the order of FarkleEnv.action_mask().ravel(), which
+    action_masks() returns, and which replaces info["action_mask"] when the wrapped
+    environment was created with action_masks=True.
+
+    Every action dict is built once, so decoding an action is a tuple lookup. The lock arrays
+    in those dicts are shared and read-only.
+    """
+
+    def __init__(self, env):
+        super().__init__(env)
+        dice = env.unwrapped.dice
+        self.action_space = gym.spaces.Discrete(2 << dice)
+
+        # row m holds the lock array of bit mask m
+        locks = (np.arange(1 << dice)[:, None] >> np.arange(dice)) & 1
+        locks.flags.writeable = False
+        self._locks = locks
+        self._actions = tuple({"bank": bank, "lock": lock} for bank in (False, True) for lock in locks)
+
+    def action(self, action):
+        """
+        decodes a discrete action index into the action dict expected by FarkleEnv.step
+        """
+        return self._actions[action]
+
+    def reverse_action(self, action):
+        """
+        encodes a FarkleEnv action dict into its discrete action index
+        """
+        return DiscreteActionWrapper.encode_action(action["lock"], action["bank"])
+
+    @staticmethod
+    def encode_action(lock, bank):
+        """
+        returns the discrete action index of locking the dice in lock, and banking if bank is True
+
+        Parameters
+        ----------
+        lock: array-like
+            1 in indices where the corresponding die is locked, 0 otherwise
+        bank: bool
+            True if banking
+
+        Returns
+        -------
+        int
+            the action index, bank * 2**dice + lock mask
+        """
+        mask = 0
+        for i, locked in enumerate(lock):
+            if locked:
+                mask |= 1 << i
+        return (int(bool(bank)) << len(lock)) | mask
+
+    def action_masks(self):
+        """
+        returns which discrete actions are legal in the current state
+
+        Returns
+        -------
+        np.ndarray
+            boolean array with one entry per action index
+        """
+        return self.env.unwrapped.action_mask().reshape(-1)
+
+    def _flatten_mask(self, info):
+        if "action_mask" in info:
+            info["action_mask"] = info["action_mask"].reshape(-1)
+        return info
+
+    def reset(self, *, seed = None, options = None):
+        observation, info = self.env.reset(seed=seed, options=options)
+        return observation, self._flatten_mask(info)
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(self.action(action))
+        return observation, reward, terminated, truncated, self._flatten_mask(info)
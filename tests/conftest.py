@@ -0,0 +1,32 @@
+import os
+import sys
+
+# the modules live flat in src/, and import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+from testing import FarkleEnv
+
+
+def random_action(env, rng):
+    """
+    picks a uniformly random legal action that locks something or banks in a FarkleEnv
+    """
+    action_mask = env.action_mask()
+    action_mask[0, 0] = False
+    bank, mask = divmod(int(rng.choice(np.flatnonzero(action_mask))), action_mask.shape[1])
+    return {"bank": bool(bank), "lock": FarkleEnv.mask_to_lock(mask, env.dice)}
+
+def random_actions(action_mask, rng):
+    """
+    picks a random legal action that locks something or banks in each game of a batch, from the
+    batched info["action_mask"] of a vector env. a game with no such action gets the free reroll,
+    which an autoresetting vector env ignores anyway
+    """
+    action_mask = action_mask.reshape(len(action_mask), -1).copy()
+    action_mask[:, 0] = False
+    indices = np.array([rng.choice(np.flatnonzero(row)) if row.any() else 0 for row in action_mask])
+    return {
+        "bank": (indices >> 6).astype(np.int8).reshape(-1, 1),
+        "lock": ((indices[:, None] >> np.arange(6)) & 1).astype(np.int8),
+    }
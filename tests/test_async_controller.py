@@ -0,0 +1,67 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import async_controller
+import player_testing
+
+
+class ScriptedClient:
+    """
+    The far end of a StreamPlayer, answering every play message with a legal move on an in-memory
+    stream. replies maps a move number to a message sent instead, and late to the moves answered
+    after a delay
+    """
+
+    def __init__(self, reader, replies = None, late = (), delay = 0.05):
+        self.reader = reader
+        self.replies = replies or {}
+        self.late = late
+        self.delay = delay
+
+    def write(self, data):
+        message = json.loads(data)
+        if message["type"] != "play":
+            return
+        move = message["move"]
+        mask = np.array(message["action_mask"], dtype=bool)
+        mask[0, 0] = False
+        bank, lock = divmod(int(np.flatnonzero(mask)[0]), mask.shape[1])
+        reply = self.replies.get(move, {"move": move, "lock": [(lock >> i) & 1 for i in range(6)], "bank": bool(bank)})
+        line = json.dumps(reply).encode() + b"\n"
+        if move in self.late:
+            asyncio.get_running_loop().call_later(self.delay, self.reader.feed_data, line)
+        else:
+            self.reader.feed_data(line)
+
+    async def drain(self):
+        pass
+
+def _play(replies = None, late = ()):
+    async def game():
+        reader = asyncio.StreamReader()
+        player = async_controller.StreamPlayer(reader, ScriptedClient(reader, replies, late))
+        controller = async_controller.make_controller([player, player_testing.RandomPlayer()], max_points=2000, move_timeout=0.02)
+        winner, turns, points = await controller.play_game(seed=0)
+        return controller, player, winner
+    return asyncio.run(game())
+
+def test_late_reply_is_dropped():
+    controller, player, winner = _play(late={1})
+    assert player.move > 2
+    # only the move that timed out was played by the fallback, the late reply to it was not taken for move 2
+    assert controller.fallback_moves[0] == 1
+
+@pytest.mark.parametrize("reply", [{"lock": 5, "bank": False}, {"lock": None, "bank": False}, {"lock": [2, 0, 0, 0, 0, 0], "bank": False}, {"lock": [1, 0, 0, 0, 0], "bank": False}, {"lock": [1, 0, 0, 0, 0, 0], "bank": "yes"}, [1, 2]])
+def test_malformed_reply_falls_back(reply):
+    if isinstance(reply, dict):
+        reply = {"move": 1, **reply}
+    controller, player, winner = _play(replies={1: reply})
+    assert winner in (0, 1)
+    assert controller.fallback_moves[0] == 1
+
+def test_parse_action():
+    assert async_controller.parse_action({"lock": np.array([1, 0, 0, 0, 0, 1]), "bank": np.array([True])}, 6) == ([1, 0, 0, 0, 0, 1], True)
+    for lock in ([2, 0, 0, 0, 0, 0], [1.0, 0, 0, 0, 0, 0], "100000", [1, 0]):
+        with pytest.raises(ValueError):
+            async_controller.parse_action({"lock": lock, "bank": False}, 6)
@@ -0,0 +1,53 @@
+import asyncio
+import random
+import async_controller
+import controller_testing
+import player_testing
+from testing import FarkleEnv
+
+
+class RecordingPlayer(player_testing.RandomPlayer):
+    """
+    a RandomPlayer that keeps every update it is sent
+    """
+
+    def __init__(self, updates):
+        super().__init__()
+        self.updates = updates
+
+    def update(self, observation, reward):
+        self.updates.append((self.seat, int(observation["turn"]), tuple(observation["dice_values"]), tuple(observation["dice_locked"]), int(observation["points_this_turn"]), reward))
+
+
+def _updates(auto_advance, seed, run_async = False):
+    updates = []
+    players = [RecordingPlayer(updates) for _ in range(3)]
+    for seat, player in enumerate(players):
+        player.seat = seat
+    if run_async:
+        controller = async_controller.make_controller(players, max_points=3000, auto_advance=auto_advance)
+        asyncio.run(controller.play_game(seed))
+    else:
+        controller = controller_testing.FarkleController(FarkleEnv(players=3, max_points=3000, auto_advance=auto_advance), players)
+        for player in players:
+            player.set_controller(controller)
+        random.seed(seed)
+        controller.play_game(seed)
+    return updates
+
+def test_players_get_the_same_updates_with_auto_advance():
+    skipped = 0
+    for seed in range(20):
+        updates = _updates(False, seed)
+        assert _updates(True, seed) == updates
+        # every player, skipped or not, is sent observations of its own turn
+        assert all(seat == turn for seat, turn, *_ in updates)
+        skipped += sum(1 for update in updates if update[-1] == -1)
+    assert skipped
+
+def test_async_players_get_the_same_updates_with_auto_advance():
+    for seed in range(5):
+        random.seed(seed)
+        updates = _updates(False, seed, run_async=True)
+        random.seed(seed)
+        assert _updates(True, seed, run_async=True) == updates
@@ -0,0 +1,72 @@
+import random
+import numpy as np
+import pytest
+import controller_testing
+import player_testing
+from game_record import GameRecord, GameRecorder, GameReplayer, read_records
+from testing import FarkleEnv
+
+
+def _assert_same_state(state, expected):
+    for field in ("dice_values", "dice_locked", "player_points", "points_this_turn", "turn", "unlocked_index"):
+        assert np.array_equal(getattr(state, field), getattr(expected, field)), field
+    block, position, generator_state = state.dice_stream
+    expected_block, expected_position, expected_generator_state = expected.dice_stream
+    assert np.array_equal(block, expected_block)
+    assert position == expected_position
+    assert generator_state == expected_generator_state
+
+def _record_games(path, auto_advance, seeds):
+    """
+    plays a seeded game between RandomPlayers for each seed, recording them to path, and returns their final points
+    """
+    players = [player_testing.RandomPlayer() for _ in range(3)]
+    controller = controller_testing.FarkleController(FarkleEnv(players=3, max_points=3000, auto_advance=auto_advance), players, recorder=GameRecorder(path))
+    for player in players:
+        player.set_controller(controller)
+    random.seed(0)
+    return [controller.play_game(seed)[2].copy() for seed in seeds]
+
+@pytest.mark.parametrize("auto_advance", [False, True])
+def test_recorded_games_replay(tmp_path, auto_advance):
+    path = str(tmp_path / "games.frkl")
+    seeds = [3, 5, 8]
+    points = _record_games(path, auto_advance, seeds)
+
+    # the records are appended one after the other, and read back from the concatenated bytes
+    records = read_records(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    for record in records:
+        parsed, offset = GameRecord.from_bytes(data, offset)
+        assert (parsed.seed, parsed.players, parsed.max_points, parsed.events) == (record.seed, record.players, record.max_points, record.events)
+    assert offset == len(data)
+    assert [record.seed for record in records] == seeds
+
+    for record, final_points in zip(records, points):
+        replayer = GameReplayer(record)
+        observation = replayer.seek(len(record))
+        assert np.array_equal(observation["player_points"], final_points)
+
+def test_seeking_back_restores_the_turn(tmp_path):
+    path = str(tmp_path / "games.frkl")
+    _record_games(path, True, [13])
+    record = read_records(path)[0]
+    replayer = GameReplayer(record)
+    replayer.seek(len(record))
+    last = replayer.turn
+    assert last > 4
+
+    replayer.seek_turn(last - 1)
+    for turn in (last // 2, 1, last - 2):
+        observation = replayer.seek_turn(turn)
+        fresh = GameReplayer(record)
+        expected = fresh.seek_turn(turn)
+        _assert_same_state(replayer.env.get_state(), fresh.env.get_state())
+        for key in expected:
+            assert np.array_equal(observation[key], expected[key])
+
+    # replaying on from a restored turn still ends the same way
+    replayer.seek_turn(1)
+    assert np.array_equal(replayer.seek(len(record))["player_points"], GameReplayer(record).seek(len(record))["player_points"])
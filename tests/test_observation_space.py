@@ -0,0 +1,83 @@
+import functools
+import gymnasium as gym
+import numpy as np
+import pytest
+from conftest import random_action, random_actions
+from testing import FarkleEnv
+from vector_env import VectorFarkleEnv
+
+
+@pytest.mark.parametrize("auto_advance", [False, True])
+@pytest.mark.parametrize("observation_mode", ["live", "copy", "buffered"])
+def test_observations_are_in_the_observation_space(observation_mode, auto_advance):
+    env = FarkleEnv(players=3, max_points=2000, auto_advance=auto_advance, observation_mode=observation_mode)
+    rng = np.random.default_rng(0)
+    observation, info = env.reset(seed=0)
+    assert env.observation_space.contains(observation)
+    for observation in info.get("skipped_observations", []):
+        assert env.observation_space.contains(observation)
+    games = 0
+    while games < 5:
+        if not auto_advance and info["farkle"]:
+            observation, reward, terminated, truncated, info = env.acknowledge_farkle()
+            assert env.observation_space.contains(observation)
+            continue
+        action = random_action(env, rng)
+        observation, reward, terminated, truncated, info = env.step(action)
+        assert env.observation_space.contains(observation)
+        if auto_advance and info["turn_ended"] and not terminated:
+            assert env.observation_space.contains(info["final_observation"])
+            for skipped_observation in info["skipped_observations"]:
+                assert env.observation_space.contains(skipped_observation)
+        if terminated:
+            games += 1
+            observation, info = env.reset()
+            assert env.observation_space.contains(observation)
+        elif not auto_advance and action["bank"]:
+            observation, reward, terminated, truncated, info = env.acknowledge_bank()
+            assert env.observation_space.contains(observation)
+
+def _check_vector_env(env, steps = 300):
+    rng = np.random.default_rng(0)
+    observation, info = env.reset(seed=0)
+    assert env.observation_space.contains(observation)
+    for _ in range(steps):
+        observation, reward, terminated, truncated, info = env.step(random_actions(info["action_mask"], rng))
+        assert env.observation_space.contains(observation)
+
+def test_vector_observations_are_in_the_observation_space():
+    env = VectorFarkleEnv(8, players=2, max_points=2000, action_masks=True)
+    _check_vector_env(env)
+
+def test_make_vec_observations_are_in_the_observation_space():
+    env = gym.make_vec("gymnasium_env/FarkleEnv-v0", num_envs=8, players=2, max_points=2000, action_masks=True)
+    try:
+        assert isinstance(env.unwrapped, VectorFarkleEnv)
+        _check_vector_env(env)
+    finally:
+        env.close()
+
+@pytest.mark.parametrize("observation_mode", ["live", "copy", "buffered"])
+def test_shared_memory_observations_match_sync_vector_env(observation_mode):
+    env_fns = [functools.partial(FarkleEnv, players=2, max_points=2000, auto_advance=True, action_masks=True, random_seed=i, observation_mode=observation_mode) for i in range(4)]
+    async_env = gym.vector.AsyncVectorEnv(env_fns, shared_memory=True)
+    sync_env = gym.vector.SyncVectorEnv(env_fns)
+    rng = np.random.default_rng(0)
+    try:
+        observation, info = async_env.reset()
+        sync_observation, sync_info = sync_env.reset()
+        for _ in range(200):
+            assert async_env.observation_space.contains(observation)
+            for key in observation:
+                assert np.array_equal(observation[key], sync_observation[key])
+            assert np.array_equal(info["action_mask"], sync_info["action_mask"])
+            action = random_actions(info["action_mask"], rng)
+            observation, reward, terminated, truncated, info = async_env.step(action)
+            sync_observation, sync_reward, sync_terminated, sync_truncated, sync_info = sync_env.step(action)
+            assert np.array_equal(reward, sync_reward)
+            assert np.array_equal(terminated, sync_terminated)
+            assert np.array_equal(truncated, sync_truncated)
+        assert async_env.observation_space.contains(observation)
+    finally:
+        async_env.close()
+        sync_env.close()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from conftest import random_action
+from replay_buffer import ReplayBuffer
+from testing import FarkleEnv
+
+
+def _transitions(count, players = 2, seed = 0):
+    """
+    plays random legal actions in an auto_advance FarkleEnv, returning (observation, action, reward, next observation, done) copies
+    """
+    env = FarkleEnv(players=players, auto_advance=True, observation_mode="copy")
+    rng = np.random.default_rng(seed)
+    observation, info = env.reset(seed=seed)
+    transitions = []
+    while len(transitions) < count:
+        action = random_action(env, rng)
+        next_observation, reward, terminated, truncated, info = env.step(action)
+        transitions.append((observation, action, reward, next_observation, terminated))
+        observation = next_observation
+        if terminated:
+            observation, info = env.reset()
+    return transitions
+
+def test_next_turn_is_stored():
+    transitions = _transitions(200)
+    buffer = ReplayBuffer(len(transitions), players=2)
+    for transition in transitions:
+        buffer.add(*transition)
+    batch = buffer.unpack(buffer._records[:len(transitions)])
+    assert np.array_equal(batch["turn"], [observation["turn"] for observation, *_ in transitions])
+    assert np.array_equal(batch["next_turn"], [transition[3]["turn"] for transition in transitions])
+    # some transitions end a turn, and hand the dice to the other player
+    assert np.any(batch["turn"] != batch["next_turn"])
+
+def test_memory_mapped_buffer_reopens(tmp_path):
+    path = str(tmp_path / "buffer.npy")
+    transitions = _transitions(30)
+    buffer = ReplayBuffer(20, players=2, path=path)
+    for transition in transitions[:25]:
+        buffer.add(*transition)
+    buffer.flush()
+    stored = np.array(buffer._records)
+    del buffer
+
+    reopened = ReplayBuffer(20, players=2, path=path, mode="r+", prioritized=True)
+    assert len(reopened) == 20 and reopened._position == 5
+    assert np.array_equal(np.array(reopened._records), stored)
+    for transition in transitions[25:]:
+        reopened.add(*transition)
+    assert reopened._position == 10
+    indices, batch, weights = reopened.sample(8, np.random.default_rng(0))
+    assert len(batch["next_turn"]) == 8
+
+    with pytest.raises(ValueError):
+        ReplayBuffer(10, players=2, path=path, mode="r+")
+    # w+ starts over, whatever the file held
+    assert len(ReplayBuffer(20, players=2, path=path)) == 0
+    assert len(ReplayBuffer(20, players=2, path=path, mode="r+")) == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import controller_testing
+import player_testing
+from testing import FarkleEnv
+from vector_env import VectorFarkleEnv
+
+
+@pytest.fixture(scope="module")
+def table_path(tmp_path_factory):
+    agent = player_testing.RLAgent()
+    agent.train(VectorFarkleEnv(64, players=2), 50, seed=0)
+    path = tmp_path_factory.mktemp("rl") / "q.npy"
+    agent.save(path)
+    return path
+
+def _play(agent, seed):
+    env = FarkleEnv(players=2)
+    players = [agent, player_testing.RandomPlayer()]
+    controller = controller_testing.FarkleController(env, players)
+    for player in players:
+        player.set_controller(controller)
+    return controller.play_game(seed)
+
+def test_read_only_load_plays_a_full_game(table_path):
+    agent = player_testing.RLAgent(path=table_path)
+    agent.load(table_path, mmap_mode="r")
+    assert agent.frozen
+    before = np.array(agent.q)
+
+    for seed in range(3):
+        winner, turns, points = _play(agent, seed)
+        assert winner in (0, 1) and points[winner] >= 10000
+
+    assert np.array_equal(agent.q, before)
+    assert agent._batch_size == 0
+
+def test_learning_a_read_only_table_raises(table_path):
+    agent = player_testing.RLAgent()
+    agent.load(table_path, mmap_mode="r")
+    states = np.zeros(1, dtype=np.int64)
+    with pytest.raises(ValueError):
+        agent.learn(states, np.ones(1, dtype=np.int64), np.zeros(1), states, np.ones(1, dtype=bool))
+
+def test_copy_on_write_load_keeps_learning(table_path):
+    agent = player_testing.RLAgent(batch_size=1)
+    agent.load(table_path, mmap_mode="c")
+    assert not agent.frozen
+    _play(agent, 0)
+    assert not np.array_equal(agent.q, np.load(table_path))
@@ -0,0 +1,46 @@
+import random
+import pytest
+import controller_testing
+import endgame_solver
+import player_testing
+import solver
+from testing import FarkleEnv
+
+
+@pytest.fixture(scope="module")
+def turn_policy(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("turn_policy"))
+    values, policy = solver.solve(1000)
+    solver.save(path, values, policy, 1000)
+    return path
+
+@pytest.fixture(scope="module")
+def endgame(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("endgame"))
+    endgame_solver.solve(path, max_points=500)
+    return path
+
+def _controller(players, max_points):
+    return controller_testing.FarkleController(FarkleEnv(players=len(players), max_points=max_points), players)
+
+def test_optimal_player_plays_the_game_it_was_solved_for(turn_policy):
+    players = [player_testing.OptimalPlayer(turn_policy), player_testing.RandomPlayer()]
+    controller = _controller(players, 1000)
+    for player in players:
+        player.set_controller(controller)
+    random.seed(0)
+    for seed in range(5):
+        winner, turns, player_points = controller.play_game(seed)
+        assert player_points.max() >= 1000
+
+@pytest.mark.parametrize("max_points", [500, 2000])
+def test_optimal_player_rejects_other_max_points(turn_policy, max_points):
+    player = player_testing.OptimalPlayer(turn_policy)
+    with pytest.raises(ValueError, match="max_points=1000"):
+        player.set_controller(_controller([player], max_points))
+
+def test_endgame_player_rejects_other_max_points(endgame):
+    player = player_testing.EndgamePlayer(endgame)
+    player.set_controller(_controller([player, player_testing.RandomPlayer()], 500))
+    with pytest.raises(ValueError, match="max_points=500"):
+        player.set_controller(_controller([player, player_testing.RandomPlayer()], 1000))
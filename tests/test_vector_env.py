@@ -0,0 +1,24 @@
+import numpy as np
+from conftest import random_actions
+from vector_env import VectorFarkleEnv
+
+
+def test_passed_turns_account_for_every_turn_change():
+    players = 3
+    env = VectorFarkleEnv(64, players=players, max_points=2000, action_masks=True)
+    rng = np.random.default_rng(0)
+    observation, info = env.reset(seed=0)
+    # games start on player 0, then move one player further for every turn passed over
+    assert np.array_equal(observation["turn"], info["passed_turns"] % players)
+    autoreset = np.zeros(env.num_envs, dtype=bool)
+    passed_total = 0
+    for _ in range(500):
+        turn = observation["turn"]
+        observation, reward, terminated, truncated, info = env.step(random_actions(info["action_mask"], rng))
+        ended = (reward == -1) & ~autoreset
+        expected = np.where(autoreset, info["passed_turns"], turn + ended + info["passed_turns"]) % players
+        assert np.array_equal(observation["turn"], expected)
+        assert not info["passed_turns"][~ended & ~autoreset].any()
+        passed_total += info["passed_turns"].sum()
+        autoreset = terminated | truncated
+    assert passed_total